@@ -0,0 +1,125 @@
+"""
+Approximate nearest neighbour index over word vectors (IVF - inverted file index with k-means coarse centroids).
+The unit vectors are clustered into n_lists lists around spherical k-means centroids. A query is only scored
+against the vectors of its n_probe closest lists, so it costs about O((n_lists + V * n_probe / n_lists) * N)
+instead of O(V * N). More probes find more of the exact neighbours at the cost of speed.
+Reference: https://arxiv.org/abs/1702.08734
+"""
+
+import numpy as np
+from similarity import MAX_SCORES, normalize_rows, top_k
+
+# Number of lists probed per query when none is given
+N_PROBE = 8
+
+# Number of sample vectors per list used to train the centroids
+TRAIN_SAMPLES_PER_LIST = 64
+
+# Returns the ID of the closest centroid of every vector, scored in chunks of at most MAX_SCORES
+def assign_lists(vectors, centroids):
+    chunk = max(MAX_SCORES // len(centroids), 1)
+
+    return np.concatenate([np.argmax(np.matmul(vectors[i:i + chunk], centroids.T), axis=1)
+                           for i in range(0, len(vectors), chunk)])
+
+# Spherical k-means - n_lists unit centroids that maximise the cosine similarity with the vectors assigned to them
+def train_centroids(vectors, n_lists, n_iter=10, seed=0):
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), n_lists, replace=False)]
+
+    for _ in range(n_iter):
+        lists = assign_lists(vectors, centroids)
+
+        # New centroid is the normalised sum of the vectors of a list - the vectors are sorted by list
+        # so that the sum of every list is one np.add.reduceat
+        counts = np.bincount(lists, minlength=n_lists)
+        starts = np.cumsum(counts) - counts
+        full = counts > 0
+        centroids = np.empty_like(centroids)
+        centroids[full] = normalize_rows(np.add.reduceat(vectors[np.argsort(lists, kind='stable')], starts[full], axis=0))
+
+        # Lists that lost all their vectors restart from a random vector
+        centroids[~full] = vectors[rng.choice(len(vectors), int(np.sum(~full)), replace=False)]
+
+    return centroids
+
+class IVFIndex:
+    def __init__(self, centroids, ids, vectors, offsets, n_probe=N_PROBE):
+        # centroids - n_lists x N unit centroids
+        # ids - row IDs of all the vectors sorted by list, vectors - their unit vectors in the same order
+        # offsets - position of the first vector of every list in ids and vectors (n_lists + 1), so a list is one slice
+        self.centroids = centroids
+        self.ids = ids
+        self.vectors = vectors
+        self.offsets = offsets
+        self.n_probe = n_probe
+
+    # Builds the index of the rows of vectors (e.g. w1), normalised to compare them by cosine similarity
+    # n_lists defaults to sqrt(V) lists, the centroids are trained on a sample of TRAIN_SAMPLES_PER_LIST vectors per list
+    @classmethod
+    def build(cls, vectors, n_lists=None, n_probe=N_PROBE, n_iter=10, seed=0):
+        normed = normalize_rows(vectors)
+        n_lists = min(n_lists or max(int(np.sqrt(len(normed))), 1), len(normed))
+
+        rng = np.random.default_rng(seed)
+        sample = normed[rng.choice(len(normed), min(len(normed), n_lists * TRAIN_SAMPLES_PER_LIST), replace=False)]
+        centroids = train_centroids(sample, n_lists, n_iter, seed)
+
+        # Store the vectors list by list so that probing a list reads one contiguous block
+        lists = assign_lists(normed, centroids)
+        ids = np.argsort(lists, kind='stable')
+        offsets = np.concatenate(([0], np.cumsum(np.bincount(lists, minlength=n_lists))))
+
+        return cls(centroids, ids, normed[ids], offsets, n_probe)
+
+    # Finds the approximate top k rows of every query, like similarity.top_k
+    # queries - BxN (normalised for cosine scores), exclude - BxE row IDs left out of every query (or None)
+    # n_probe - number of lists searched per query (defaults to self.n_probe), more lists give a better recall
+    # Returns the row IDs and their scores in descending order of score, both Bxk (padded with -1 and -inf
+    # when the probed lists hold fewer than k vectors)
+    def search(self, queries, k, n_probe=None, exclude=None):
+        queries = np.atleast_2d(queries)
+        n_probe = min(n_probe or self.n_probe, len(self.centroids))
+
+        ids = np.full((len(queries), k), -1, dtype=np.int64)
+        scores = np.full((len(queries), k), -np.inf, dtype=np.result_type(self.vectors, queries))
+
+        # Closest lists of every query
+        probes, _ = top_k(self.centroids, queries, n_probe)
+
+        for q, query in enumerate(queries):
+            # Score the query against the vectors of its lists only
+            start, end = self.offsets[probes[q]], self.offsets[probes[q] + 1]
+            rows = np.concatenate([np.arange(s, e) for s, e in zip(start, end)])
+            sims = np.matmul(self.vectors[rows], query)
+            if exclude is not None:
+                sims[np.isin(self.ids[rows], exclude[q])] = -np.inf
+
+            # Pick the k best candidates in O(candidates), then sort only those k
+            found = min(k, len(sims))
+            if found == 0:
+                continue
+            best = np.argpartition(-sims, found - 1)[:found]
+            best = best[np.argsort(-sims[best], kind='stable')]
+            ids[q, :found] = self.ids[rows[best]]
+            scores[q, :found] = sims[best]
+
+        return ids, scores
+
+    # Saves the index into a single .npz file
+    def save(self, path):
+        np.savez(path, centroids=self.centroids, ids=self.ids, vectors=self.vectors, offsets=self.offsets,
+                 n_probe=self.n_probe)
+
+    # Loads an index written by save
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as f:
+            return cls(f['centroids'], f['ids'], f['vectors'], f['offsets'], int(f['n_probe']))
+
+# Fraction of the exact top k neighbours of the queries that the index finds (recall@k)
+# exact_ids and approx_ids are the Bxk results of similarity.top_k and IVFIndex.search for the same queries
+def recall_at_k(exact_ids, approx_ids):
+    found = sum(len(np.intersect1d(exact, approx)) for exact, approx in zip(exact_ids, approx_ids))
+
+    return found / max(exact_ids.size, 1)
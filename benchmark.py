@@ -0,0 +1,311 @@
+"""
+Throughput benchmark of the Word2Vec training objectives on synthetic corpora
+
+Run with: python benchmark.py --tokens 20000 --vocab 1000 5000 20000
+or, to compare batch sizes: python benchmark.py --tokens 20000 --vocab 5000 --batch-sizes 1 16 64 256
+or, for the nearest neighbour index: python benchmark.py --vocab 1000000 --ann 1 4 8 16
+or, to compare the floating point types: python benchmark.py --tokens 50000 --vocab 5000 --dtypes
+or, for a JSON report over a grid of settings: python benchmark.py --suite --vocab 1000 10000 --n 50 100 --json report.json
+"""
+
+import argparse
+import itertools
+import json
+import multiprocessing as mp
+import platform
+import resource
+import sys
+import time
+import numpy as np
+from hoffman_binary import create_tree, create_code
+from ann import IVFIndex, recall_at_k
+from similarity import normalize_rows, top_k
+from model_io import to_bfloat16, from_bfloat16
+
+from skipgram import skipgram
+from cbow import word2vec_cbow
+
+# Models and training objectives of the benchmarks, by name
+MODELS = {'skipgram': skipgram, 'cbow': word2vec_cbow}
+OBJECTIVES = {
+    'softmax': {'negative_samples': 0, 'hierarchical_softmax': False},
+    'negative_sampling': {'negative_samples': 5, 'hierarchical_softmax': False},
+    'hierarchical_softmax': {'negative_samples': 0, 'hierarchical_softmax': True},
+}
+
+# Creates a corpus of n_tokens words drawn from a Zipfian distribution over v_count words,
+# split into sentences of sentence_len words
+def zipf_corpus(n_tokens, v_count, sentence_len=20, seed=0):
+    rng = np.random.default_rng(seed)
+    probs = 1 / np.arange(1, v_count + 1)
+    probs /= probs.sum()
+    tokens = rng.choice(v_count, size=n_tokens, p=probs)
+
+    return [['w%d' % word for word in tokens[i:i + sentence_len]] for i in range(0, n_tokens, sentence_len)]
+
+# Trains the model on the corpus and returns the number of words trained per second
+def words_per_sec(model, corpus):
+    training_data = model.generate_training_data(corpus)
+    n_tokens = sum(len(sentence) for sentence in corpus)
+
+    start = time.perf_counter()
+    model.train(training_data, verbose=False)
+    elapsed = time.perf_counter() - start
+
+    return n_tokens * model.epochs / elapsed
+
+# Compares the skipgram objectives (full softmax, negative sampling and hierarchical softmax) as V grows
+def compare_skipgram_objectives(v_counts, n_tokens, n=100, window_size=2):
+    results = []
+    for v_count in v_counts:
+        corpus = zipf_corpus(n_tokens, v_count)
+        for name, objective in OBJECTIVES.items():
+            settings = {
+                'window_size': window_size,
+                'n': n,
+                'epochs': 1,
+                'learning_rate': 0.025,
+                **objective
+            }
+            np.random.seed(0)
+            results.append((v_count, name, words_per_sec(skipgram(settings), corpus)))
+            print('V=%-8d %-22s %10.0f words/sec' % results[-1])
+
+    return results
+
+# Compares the throughput and the final loss per context word of every objective of both models across batch sizes
+# Bigger batches are faster but apply the updates of a whole batch at once, which can slow down convergence
+def compare_batch_sizes(batch_sizes, v_count, n_tokens, n=100, window_size=2, epochs=2):
+    corpus = zipf_corpus(n_tokens, v_count)
+    n_pairs = sum(len(sentence) for sentence in corpus) * 2 * window_size
+
+    results = []
+    for model_class in (skipgram, word2vec_cbow):
+        for name, objective in OBJECTIVES.items():
+            for batch_size in batch_sizes:
+                settings = {
+                    'window_size': window_size,
+                    'n': n,
+                    'epochs': epochs,
+                    'learning_rate': 0.025,
+                    'batch_size': batch_size,
+                    **objective
+                }
+                np.random.seed(0)
+                model = model_class(settings)
+                speed = words_per_sec(model, corpus)
+                results.append((model_class.__name__, name, batch_size, speed, float(np.sum(model.loss)) / n_pairs))
+                print('%-14s %-22s B=%-6d %10.0f words/sec   loss %.4f' % results[-1])
+
+    return results
+
+# Compares the training types float64 and float32 for every objective of both models - throughput, loss per context
+# word and how many of the top k neighbours of the float64 embeddings the float32 embeddings agree on
+# Then compares the storage types float16 and bfloat16 of the float32 embeddings - size, error and neighbour recall
+def compare_dtypes(v_count, n_tokens, n=100, window_size=2, epochs=1, k=10, n_queries=200):
+    corpus = zipf_corpus(n_tokens, v_count)
+    n_pairs = sum(len(sentence) for sentence in corpus) * 2 * window_size
+
+    results = []
+    for model_class in (skipgram, word2vec_cbow):
+        for name, objective in OBJECTIVES.items():
+            neighbours = {}
+            for dtype in ('float64', 'float32'):
+                settings = {
+                    'window_size': window_size,
+                    'n': n,
+                    'epochs': epochs,
+                    'learning_rate': 0.025,
+                    'dtype': dtype,
+                    **objective
+                }
+                np.random.seed(0)
+                model = model_class(settings)
+                speed = words_per_sec(model, corpus)
+
+                # Neighbours of the most frequent words, the ones that are trained the most
+                queries = np.arange(min(n_queries, model.v_count))
+                normed = model.normalized_vectors()
+                neighbours[dtype], _ = top_k(normed, normed[queries], k, exclude=queries.reshape((-1, 1)))
+
+                agreement = recall_at_k(neighbours['float64'], neighbours[dtype])
+                results.append((model_class.__name__, name, dtype, speed, float(np.sum(model.loss)) / n_pairs, agreement))
+                print('%-14s %-22s %-8s %10.0f words/sec   loss %.4f   top-%d agreement %.3f' %
+                      (*results[-1][:5], k, agreement))
+
+    # Storage types of the last float32 embeddings
+    vectors = model.w1
+    queries = np.arange(min(n_queries, len(vectors)))
+    normed = normalize_rows(vectors)
+    exact, _ = top_k(normed, normed[queries], k, exclude=queries.reshape((-1, 1)))
+    for dtype, stored in (('float32', vectors),
+                          ('float16', vectors.astype(np.float16).astype(np.float32)),
+                          ('bfloat16', from_bfloat16(to_bfloat16(vectors)))):
+        normed = normalize_rows(stored)
+        approx, _ = top_k(normed, normed[queries], k, exclude=queries.reshape((-1, 1)))
+        size = vectors.size * (4 if dtype == 'float32' else 2)
+        print('storage %-8s %8.1f MB   max error %.2e   top-%d recall %.3f' %
+              (dtype, size / 1e6, np.max(np.abs(stored - vectors)), k, recall_at_k(exact, approx)))
+
+    return results
+
+# Trains one configuration of the benchmark suite and measures it
+# config - dict with model, objective, v_count, n, window_size, epochs, n_tokens and batch_size
+# Returns config with the words trained per second, the time of every epoch and of every phase of training (see
+# hooks.py), the time to build the vocabulary and the Hoffman tree (None unless hierarchical softmax) and the peak
+# resident memory of the process in bytes
+# Note: ru_maxrss is the peak of the whole process, so every configuration runs in a fresh process (see benchmark_suite)
+def run_config(config):
+    corpus = zipf_corpus(config['n_tokens'], config['v_count'])
+    n_tokens = sum(len(sentence) for sentence in corpus)
+    settings = {
+        'window_size': config['window_size'],
+        'n': config['n'],
+        'epochs': config['epochs'],
+        'learning_rate': 0.025,
+        'batch_size': config['batch_size'],
+        'timers': True,
+        **OBJECTIVES[config['objective']]
+    }
+    np.random.seed(0)
+    model = MODELS[config['model']](settings)
+
+    start = time.perf_counter()
+    training_data = model.generate_training_data(corpus)
+    vocab_time = time.perf_counter() - start
+
+    # The tree is built by build_vocab above, so it is timed again on its own
+    huffman_time = None
+    if model.hierarchical_softmax:
+        start = time.perf_counter()
+        parent, binary = create_tree(model.word_counts)
+        create_code(parent, binary, model.v_count)
+        huffman_time = time.perf_counter() - start
+
+    # Same steps as train with a single worker, timed epoch by epoch
+    start = time.perf_counter()
+    model.init_weights()
+    init_time = time.perf_counter() - start
+
+    epoch_times = []
+    model.loss = 0
+    for _ in range(model.epochs):
+        start = time.perf_counter()
+        model.train_epoch(training_data)
+        epoch_times.append(time.perf_counter() - start)
+
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform != 'darwin':
+        peak_rss *= 1024
+
+    return {
+        **config,
+        'actual_v_count': model.v_count,
+        'words_per_sec': n_tokens * model.epochs / sum(epoch_times),
+        'epoch_times': epoch_times,
+        'phase_times': dict(model.monitor.times),
+        'vocab_time': vocab_time,
+        'huffman_time': huffman_time,
+        'init_time': init_time,
+        'peak_rss': peak_rss,
+        'loss': float(np.sum(model.loss)),
+    }
+
+# Runs every combination of models, objectives, vocabulary sizes, dimensions, window sizes and epochs on synthetic
+# Zipfian corpora of n_tokens words, each in a fresh process so that the peak memory of a run is its own
+# Returns a JSON-serialisable report - the versions and machine the numbers were measured on, and one result per run
+def benchmark_suite(models, objectives, v_counts, ns, windows, epochs_list, n_tokens, batch_size=64):
+    configs = [{'model': model, 'objective': objective, 'v_count': v_count, 'n': n, 'window_size': window_size,
+                'epochs': epochs, 'n_tokens': n_tokens, 'batch_size': batch_size}
+               for model, objective, v_count, n, window_size, epochs
+               in itertools.product(models, objectives, v_counts, ns, windows, epochs_list)]
+
+    results = []
+    with mp.get_context('spawn').Pool(1, maxtasksperchild=1) as pool:
+        for result in pool.imap(run_config, configs):
+            results.append(result)
+            # Progress goes to stderr so that the report can be written to stdout
+            print('%-9s %-21s V=%-8d N=%-4d window=%-2d epochs=%-2d %10.0f words/sec %8.3fs/epoch %8.1f MB' %
+                  (result['model'], result['objective'], result['v_count'], result['n'], result['window_size'],
+                   result['epochs'], result['words_per_sec'], np.mean(result['epoch_times']), result['peak_rss'] / 1e6),
+                  file=sys.stderr)
+
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpu_count': mp.cpu_count(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'results': results,
+    }
+
+# Creates v_count word vectors of n dimensions scattered around n_clusters topics, a stand-in for a trained w1
+def clustered_vectors(v_count, n, n_clusters=1000, spread=0.7, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((n_clusters, n))
+
+    return (centers[rng.integers(0, n_clusters, v_count)] + spread * rng.standard_normal((v_count, n))).astype(np.float32)
+
+# Measures the recall@k and the query latency of the IVF index for every number of probed lists,
+# against the exact scan of vec_sim
+def compare_ann_probes(n_probes, v_count, n=100, n_queries=200, k=10, n_lists=None):
+    vectors = clustered_vectors(v_count, n)
+    normed = normalize_rows(vectors)
+    queries = np.random.default_rng(1).choice(v_count, n_queries, replace=False)
+    exclude = queries.reshape((-1, 1))
+
+    start = time.perf_counter()
+    index = IVFIndex.build(vectors, n_lists)
+    print('V=%d  built %d lists in %.1fs' % (v_count, len(index.centroids), time.perf_counter() - start))
+
+    start = time.perf_counter()
+    exact_ids, _ = top_k(normed, normed[queries], k, exclude=exclude)
+    print('%-11s recall@%d %.3f  %8.3f ms/query' % ('exact', k, 1.0, 1000 * (time.perf_counter() - start) / n_queries))
+
+    results = []
+    for n_probe in n_probes:
+        start = time.perf_counter()
+        approx_ids, _ = index.search(normed[queries], k, n_probe, exclude=exclude)
+        latency = 1000 * (time.perf_counter() - start) / n_queries
+        results.append((n_probe, recall_at_k(exact_ids, approx_ids), latency))
+        print('n_probe=%-3d recall@%d %.3f  %8.3f ms/query' % (n_probe, k, results[-1][1], latency))
+
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--tokens', type=int, default=20000, help='number of tokens in the synthetic corpus')
+    parser.add_argument('--vocab', type=int, nargs='+', default=[1000, 5000, 20000], help='vocabulary sizes')
+    parser.add_argument('--n', type=int, nargs='+', default=[100], help='dimensions of word embeddings (the suite runs all of them)')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', help='compare these batch sizes on the first vocabulary size')
+    parser.add_argument('--ann', type=int, nargs='+', metavar='N_PROBE',
+                        help='measure the nearest neighbour index with these numbers of probed lists on the first vocabulary size')
+    parser.add_argument('--dtypes', action='store_true', help='compare the floating point types on the first vocabulary size')
+    parser.add_argument('--suite', action='store_true', help='run every combination of the settings below and report it as JSON')
+    parser.add_argument('--models', nargs='+', choices=list(MODELS), default=list(MODELS), help='models of the suite')
+    parser.add_argument('--objectives', nargs='+', choices=list(OBJECTIVES), default=list(OBJECTIVES),
+                        help='training objectives of the suite')
+    parser.add_argument('--window', type=int, nargs='+', default=[2], help='window sizes of the suite')
+    parser.add_argument('--epochs', type=int, nargs='+', default=[1], help='numbers of epochs of the suite')
+    parser.add_argument('--json', default='-', help='file the suite report is written to (- for stdout)')
+    args = parser.parse_args()
+
+    if args.suite:
+        report = benchmark_suite(args.models, args.objectives, args.vocab, args.n, args.window, args.epochs, args.tokens)
+        if args.json == '-':
+            json.dump(report, sys.stdout, indent=2)
+            print()
+        else:
+            with open(args.json, 'w') as f:
+                json.dump(report, f, indent=2)
+    elif args.dtypes:
+        compare_dtypes(args.vocab[0], args.tokens, n=args.n[0])
+    elif args.ann:
+        compare_ann_probes(args.ann, args.vocab[0], n=args.n[0])
+    elif args.batch_sizes:
+        compare_batch_sizes(args.batch_sizes, args.vocab[0], args.tokens, n=args.n[0])
+    else:
+        compare_skipgram_objectives(args.vocab, args.tokens, n=args.n[0])
@@ -4,8 +4,13 @@ An implementation of Continuous Bag-of-Words (CBOW) version of Word2Vec with the
 
 # Import packages
 import numpy as np
-from collections import defaultdict
-from hoffman_binary import create_tree, create_code, get_path_nodes
+from corpus import iter_batches, subsample
+from hoffman_binary import create_inner_units, hierarchical_softmax
+from scatter import scatter_subtract
+from negative_sampling import NegativeSampler, negative_sampling
+from hooks import TrainingMonitor
+from learning_rate import WordCount, decay_learning_rate
+from model_base import Word2VecBase
 
 ## Randomly initialise
 getW1 = [[0.236, -0.962, 0.686, 0.785, -0.454, -0.833, -0.744, 0.677, -0.427, -0.066],
@@ -30,333 +35,269 @@ getW2 = [[-0.868, -0.406, -0.288, -0.016, -0.560, 0.179, 0.099, 0.438, -0.551],
 		[0.096, -0.995, -0.313, 0.881, -0.402, -0.631, -0.660, 0.184, 0.487]]
 
 # Initiate class
-class word2vec_cbow:
+class word2vec_cbow(Word2VecBase):
     def __init__(self, settings):
-        self.n = settings['n']
-        self.lr = settings['learning_rate']
-        self.epochs = settings['epochs']
-        self.window = settings['window_size']
+        # The settings shared by both models (see model_base.py)
+        super().__init__(settings)
         self.hierarchical_softmax = settings['hierarchical_softmax']
+        # Number of negative samples per target word, 0 -> full softmax (unless hierarchical_softmax is set)
+        self.negative_samples = settings.get('negative_samples', 0)
     
-    def generate_training_data(self, corpus):
-        # Find unique word counts using dictonary
-        word_counts = defaultdict(int)
-        for row in corpus:
-            for word in row:
-                word_counts[word] += 1
-        #########################################################################################################################################################
-        # print(word_counts)																																	#
-        # # defaultdict(<class 'int'>, {'natural': 1, 'language': 1, 'processing': 1, 'and': 2, 'machine': 1, 'learning': 1, 'is': 1, 'fun': 1, 'exciting': 1})	#
-        #########################################################################################################################################################
-
-        # Generate a Hoffman binary tree based on word_counts if hierarchical_softmax is set to True
-        if self.hierarchical_softmax:
-            self.hoffman_root = create_tree(word_counts, self.n)
-            self.hoffman_code = create_code(self.hoffman_root)
-        #########################################################################################################################################################
-        # print(self.hoffman_code)																															    #
-        # {'processing': [0, 0, 0], 'machine': [0, 0, 1], 'learning': [0, 1, 0], 'is': [0, 1, 1], 'fun': [1, 0, 0], 'exciting': [1, 0, 1], 'and': [1, 1, 0],    #
-        # 'natural': [1, 1, 1, 0], 'language': [1, 1, 1, 1]}	                                                                                                #
-        #########################################################################################################################################################
-
-        # Get the number of unique words in corpus
-        self.v_count = len(word_counts.keys())
-        #########################
-        # print(self.v_count)	#
-        # 9						#
-        #########################
-
-        # Generate Lookup Dictionaries (vocab)
-        self.words_list = list(word_counts.keys())
-        #################################################################################################
-        # print(self.words_list)																		#
-        # ['natural', 'language', 'processing', 'and', 'machine', 'learning', 'is', 'fun', 'exciting']	#
-        #################################################################################################
-        
-        # Generate word:index
-        self.word_index = dict((word, i) for i, word in enumerate(self.words_list))
-        #############################################################################################################################
-        # print(self.word_index)																									#
-        # # {'natural': 0, 'language': 1, 'processing': 2, 'and': 3, 'machine': 4, 'learning': 5, 'is': 6, 'fun': 7, 'exciting': 8}	#
-        #############################################################################################################################
-
-        # Generate index:word
-        self.index_word = dict((i, word) for i, word in enumerate(self.words_list))
-        #############################################################################################################################
-        # print(self.index_word)																									#
-        # {0: 'natural', 1: 'language', 2: 'processing', 3: 'and', 4: 'machine', 5: 'learning', 6: 'is', 7: 'fun', 8: 'exciting'}	#
-        #############################################################################################################################
-
-        # CBOW uses context words to predict target word (reverse of SkipGram)
-        training_data = []
-
-        # Cycle through each sentence in corpus
-        for sentence in corpus:
-            sent_len = len(sentence)
-
-            if sent_len == 1:
-                continue
-
-            # Cycle through each word in sentence
-            for i, word in enumerate(sentence):
-                # Save target word 
-                w_target = word
-
-                # Cycle through context window
-                w_context = []
-
-                # Note: window_size 2 will have range of 5 values
-                for j in range(i - self.window, i + self.window+1):
-                    # Criteria for context word 
-                    # 1. Target word cannot be context word (j != i)
-                    # 2. Index must be greater or equal than 0 (j >= 0) - if not list index out of range
-                    # 3. Index must be less or equal than length of sentence (j <= sent_len-1) - if not list index out of range 
-                    if j != i and j <= sent_len-1 and j >= 0:
-                        # Append context word to w_context
-                        w_context.append(sentence[j])
-                        # print(sentence[i], sentence[j]) 
-                        #########################
-                        # Example:				#
-                        # natural language		#
-                        # natural processing	#
-                        # language natural		#
-                        # language processing	#
-                        # language append 		#
-                        #########################
-                        
-                # training_data contains a one-hot representation of the target word and context words
-                # only the word is store instead of its one-hot encoding due to storage limit and it crashes kernel
-                #################################################################################################
-                # Example:																						#
-                # [Target] natural, [Context] language, [Context] processing									#
-                # print(training_data)																			#
-                # [[[1, 0, 0, 0, 0, 0, 0, 0, 0], [[0, 1, 0, 0, 0, 0, 0, 0, 0], [0, 0, 1, 0, 0, 0, 0, 0, 0]]]]	#
-                #################################################################################################
-                training_data.append([w_target, w_context])
-
-        return training_data
-
-    def word2onehot(self, word):
-            # word_vec - initialise a blank vector
-            word_vec = np.zeros(self.v_count)
-            #############################
-            # print(word_vec)			#
-            # [0, 0, 0, 0, 0, 0, 0, 0]	#
-            #############################
-
-            # Get ID of word from word_index
-            word_index = self.word_index[word]
-
-            # Change value from 0 to 1 according to ID of the word
-            word_vec[word_index] = 1
-
-            return word_vec
-    
-    def train(self, training_data):
+    def init_weights(self):
+        # New weights make the normalised copy of w1 and its index stale
+        self.w1_norm = None
+        self.index = None
+
+        # New weights start a new training run, with the starting learning rate and no words trained
+        self.monitor = TrainingMonitor(self, self.callbacks, self.timers)
+        self.lr = self.start_lr
+        self.words_done = WordCount()
+
         # Initialising weight matrices
         # np.random.uniform(HIGH, LOW, OUTPUT_SHAPE)
         # https://docs.scipy.org/doc/numpy-1.15.1/reference/generated/numpy.random.uniform.html
-        self.w1 = np.array(getW1)
-        # self.w1 = np.random.uniform(-1, 1, (self.v_count, self.n))
+        # Note: the fixed weights above are only used when the vocabulary has the shape of the demo
+        demo_shape = (self.v_count, self.n) == np.shape(getW1)
+        if demo_shape:
+            self.w1 = np.array(getW1, dtype=self.dtype)
+        else:
+            self.w1 = np.random.uniform(-1, 1, (self.v_count, self.n)).astype(self.dtype)
         
-        # TODO: find repetitive computations because this is very slow 
         if self.hierarchical_softmax:
-            # Cycle through each epoch
-            for i in range(self.epochs):
-                print(f'Start Epoch {i}...')
-
-                # Intialise loss to 0
-                self.loss = 0
-                # Cycle through each training sample
-                # w_t = vector for target word, w_c = vectors for context words
-                for w_t, w_c in training_data:
-                    # Forward pass
-                    w_t = self.word2onehot(w_t)
-                    w_c = [self.word2onehot(context) for context in w_c]
-                    h, sum_x, inner_units = self.forward_pass_hierarchical(w_c, w_t)
-                    #########################################
-                    # print("Vector for context word:", w_c)#
-                    # print("W1-before backprop", self.w1)	#
-                    # print("Inner units-before backprop", [unit.vector for unit, _ in inner_units]) #
-                    #########################################
-
-                    # Calculate loss
-                    # There are 2 cases for the loss function: left node is 1 and right node is -1
-                    # But dir is coded as 1 and 0 and hence the if-else statements
-                    for unit, dir in inner_units:
-                        if dir == 1:
-                            self.loss += -np.log(self.sigmoid(np.dot(unit.vector.T, h)[0][0]))
-                        
-                        else:
-                            self.loss += -np.log(self.sigmoid(-np.dot(unit.vector.T, h)[0][0]))
-
-                    # Backpropagation
-                    # We use SGD to backpropagate errors - calculate loss on the output layer
-                    self.backprop_hierarchical(h, sum_x, inner_units)
-                    #########################################
-                    # print("W1-after backprop", self.w1)	#
-                    # print("Inner units-after backprop", [unit.vector for unit, _ in inner_units]) #
-                    #########################################
-                    
-                    #############################################################
-                    # Break if you want to see weights after first target word 	#
-                    # break 													#
-                    #############################################################
-
-                print('Epoch:', i, "Loss:", self.loss)
-        
+            # Initialise the inner units of the Hoffman tree - (V-1)xN
+            self.inner_units = create_inner_units(self.v_count, self.n, dtype=self.dtype)
+
+        elif self.negative_samples > 0:
+            # Note: w2 is stored column-major (w2.T is contiguous) so the output vector of a word is one
+            # contiguous block of memory for the gathers and scatter-adds of negative sampling
+            if demo_shape:
+                self.w2 = np.asfortranarray(getW2, dtype=self.dtype)
+            else:
+                self.w2 = np.asfortranarray(np.random.uniform(-1, 1, (self.n, self.v_count)).astype(self.dtype))
+
+            # Build the unigram table that negative samples are drawn from
+            self.sampler = NegativeSampler(self.word_counts, self.ns_exponent, self.table_size)
+
         else:
-            self.w2 = np.array(getW2)
-            # self.w2 = np.random.uniform(-1, 1, (self.n, self.v_count))
-
-            # Cycle through each epoch
-            for i in range(self.epochs):
-                print(f'Start Epoch {i}...')
-
-                # Intialise loss to 0
-                self.loss = 0
-                # Cycle through each training sample
-                # w_t = vector for target word, w_c = vectors for context words
-                for w_t, w_c in training_data:
-                    # Forward pass
-                    # 1. predicted y using softmax (y_pred) 2. matrix of hidden layer (h) 3. output layer before softmax (u)
-                    w_t = self.word2onehot(w_t)
-                    w_c = [self.word2onehot(context) for context in w_c]
-                    y_pred, h, u, sum_x = self.forward_pass(w_c)
-                    #########################################
-                    # print("Vector for context word:", w_c)#
-                    # print("W1-before backprop", self.w1)	#
-                    # print("W2-before backprop", self.w2)	#
-                    #########################################
-
-                    # Calculate error
-                    # 1. For all the words in vocab, calculate difference between y_pred and w_t
-                    # 2. Sum up the differences using np.sum to give us the error for this particular target word
-                    e = np.subtract(y_pred, w_t.reshape((-1, 1)))
-                    #########################
-                    # print("Error", e)	#
-                    #########################
-
-                    # Backpropagation
-                    # We use SGD to backpropagate errors - calculate loss on the output layer 
-                    self.backprop(e, h, sum_x)
-                    #########################################
-                    #print("W1-after backprop", self.w1)	#
-                    #print("W2-after backprop", self.w2)	#
-                    #########################################
-
-                    # Calculate loss
-                    # There are 2 parts to the loss function
-                    # Part 1: -ve of the actual output +
-                    # Part 2: log of sum for all elements (exponential-ed) in the output layer before softmax (u)
-                    # Note: np.where(w_t == 1)[0][0] returns the index in the context word vector with value 1
-                    # Note: u[np.where(w_t == 1)[0][0]] returns the value of the output layer before softmax
-                    # Note: loss function is calculated after backprop in this case because u is not changed by the 
-                    # backprop so the order does not matter 
-                    self.loss += -u[np.where(w_t == 1)[0][0]] + np.log(np.sum(np.exp(u)))
-                    
-                    #############################################################
-                    # Break if you want to see weights after first target word 	#
-                    # break 													#
-                    #############################################################
-
-                print('Epoch:', i, "Loss:", self.loss)
-
-    def forward_pass(self, x): 
-        # x is one-hot matrix for context words, shape - CxV (V is the vocab size and C is the number of context words)
-        c = len(x)
-        # Take the sum of the input context vectors
-        sum_x = np.sum(x, axis=0).reshape((-1, 1))
-        # Run through first matrix (w1) to get hidden layer - NxV @ Vx1
-        h = 1/c * np.matmul(self.w1.T, sum_x)
-        # Dot product hidden layer with second matrix (w2) - VxN @ Nx1 
-        u = np.matmul(self.w2.T, h)
-        # Run u through softmax to force each element to range of [0, 1] 
-        y_c = self.softmax(u)
-
-        return y_c, h, u, sum_x
-
-    def forward_pass_hierarchical(self, w_c, w_t):
-        # w_c is one-hot matrix for context words, shape - CxV (V is the vocab size and C is the number of context words)
-        c = len(w_c)
-        # Take the sum of the input context vectors
-        sum_x = np.sum(w_c, axis=0).reshape((-1, 1))
-        # Run through first matrix (w1) to get hidden layer - NxV @ Vx1
-        h = 1/c * np.matmul(self.w1.T, sum_x)
-        # Get the inner units of the Hoffman tree for w_t
-        target_word = self.index_word[np.where(w_t == 1)[0][0]]
-        inner_units = get_path_nodes(target_word, self.hoffman_code, self.hoffman_root)
-
-        return h, sum_x, inner_units
-
-    @staticmethod
-    def softmax(x):
-        e_x = np.exp(x - np.max(x))
-        return e_x / e_x.sum(axis=0)
-    
-    @staticmethod
-    def sigmoid(x):
-        return 1/(1+np.exp(-x))
+            if demo_shape:
+                self.w2 = np.array(getW2, dtype=self.dtype)
+            else:
+                self.w2 = np.random.uniform(-1, 1, (self.n, self.v_count)).astype(self.dtype)
+
+    def train_epoch(self, training_data):
+        # Runs one epoch over training_data with the weights from init_weights, adding the loss of the epoch to self.loss
+        # Training updates w1, so the normalised copy and its index are dropped
+        self.w1_norm = None
+        self.index = None
+
+        # Count the words read and time the phases of every batch (lap does nothing unless timers are on)
+        monitor = self.monitor
+        lap = monitor.lap
+        training_data = monitor.count_words(training_data)
 
-    def backprop(self, e, h, sum_x):
-        # https://docs.scipy.org/doc/numpy-1.15.1/reference/generated/numpy.outer.html
-        # Column vector e represents the prediction errors for the target word across the entire vocabulary
+        # The learning rate decays with the words read, before subsampling like the C implementation
+        training_data = decay_learning_rate(self, training_data)
+
+        # Batches trained before this epoch and loss before it, to scale up the loss of the sampled batches at the end
+        start_batches, start_loss = monitor.batches, self.loss
+
+        # Frequent words are subsampled with a new draw every epoch
+        if self.sample > 0:
+            training_data = subsample(training_data, self.keep_probs)
+
+        if self.hierarchical_softmax:
+            # Cycle through the training samples in groups of batch_size target words
+            # The paths of all the target words in a group are trained as one batch
+            for batch_number, batch in enumerate(iter_batches(training_data, self.window, self.batch_size)):
+                # w_t = IDs of target words, w_c = arrays of IDs of context words
+                w_t = np.array([target for target, _ in batch])
+                w_c = [context for _, context in batch]
+                lap('batch')
+
+                # Forward pass
+                h, contexts, c = self.forward_pass_batch(w_c)
+                lap('forward')
+                #########################################
+                # print("IDs of context words:", w_c)	#
+                # print("W1-before backprop", self.w1)	#
+                # print("Inner units-before backprop", self.inner_units) #
+                #########################################
+
+                # Forward pass through the inner units on the paths of the target words, loss and update of the
+                # inner units - the activations of the inner units are computed once and reused for all three
+                loss_weight = self.loss_weight(batch_number)
+                loss, EH = hierarchical_softmax(self.inner_units, self.points, self.codes, self.code_lens, h, w_t, self.lr, self.sigmoid, self.log_sigmoid, loss_weight > 0)
+                self.loss += loss_weight * loss
+                lap('output')
+
+                # Backpropagation
+                # We use SGD to backpropagate errors - calculate loss on the output layer
+                self.backprop_batch(EH, contexts, c)
+                lap('update')
+                monitor.batch_end(len(contexts))
+                #########################################
+                # print("W1-after backprop", self.w1)	#
+                # print("Inner units-after backprop", self.inner_units) #
+                #########################################
+                
+                #############################################################
+                # Break if you want to see weights after first batch 		#
+                # break 													#
+                #############################################################
+
+        elif self.negative_samples > 0:
+            # Cycle through the training samples in groups of batch_size target words
+            # Every target word is a positive sample for the average of its context words, and all the
+            # target words of a group are trained as one batch
+            for batch_number, batch in enumerate(iter_batches(training_data, self.window, self.batch_size)):
+                # w_t = IDs of target words, w_c = arrays of IDs of context words
+                w_t = np.array([target for target, _ in batch])
+                w_c = [context for _, context in batch]
+                lap('batch')
+
+                # Forward pass
+                h, contexts, c = self.forward_pass_batch(w_c)
+                lap('forward')
+                #########################################
+                # print("IDs of context words:", w_c)	#
+                # print("W1-before backprop", self.w1)	#
+                # print("W2-before backprop", self.w2)	#
+                #########################################
+
+                # Draw k negative samples per target word from the unigram distribution raised to ns_exponent
+                neg_samples = self.sampler.sample((len(w_t), self.negative_samples))
+                lap('sample')
+
+                # Forward pass through the output vectors of the k+1 samples of every target word, loss and update
+                # of those k+1 columns of w2 - the rest of w2 is not touched
+                loss_weight = self.loss_weight(batch_number)
+                loss, EH = negative_sampling(self.w2.T, h, w_t, neg_samples, self.lr, self.sigmoid, self.log_sigmoid, loss_weight > 0)
+                self.loss += loss_weight * loss
+                lap('output')
+
+                # Backpropagation
+                # We use SGD to backpropagate errors - calculate loss on the output layer
+                self.backprop_batch(EH, contexts, c)
+                lap('update')
+                monitor.batch_end(len(contexts))
+                #########################################
+                #print("W1-after backprop", self.w1)	#
+                #print("W2-after backprop", self.w2)	#
+                #########################################
+
+        else:
+            # Cycle through the training samples in groups of batch_size target words
+            # All the target words of a group go through the full softmax as one BxV matrix product
+            for batch_number, batch in enumerate(iter_batches(training_data, self.window, self.batch_size)):
+                # w_t = IDs of target words, w_c = arrays of IDs of context words
+                w_t = np.array([target for target, _ in batch])
+                w_c = [context for _, context in batch]
+                rows = np.arange(len(w_t))
+                lap('batch')
+
+                # Forward pass
+                # 1. predicted y using softmax (y_pred) 2. matrix of hidden layer (h) 3. output layer before softmax (u)
+                # 4. log of the sum of the exponentials of every row of u (lse), computed by the softmax
+                y_pred, h, u, lse, contexts, c = self.forward_pass(w_c)
+                lap('forward')
+                #########################################
+                # print("IDs of context words:", w_c)	#
+                # print("W1-before backprop", self.w1)	#
+                # print("W2-before backprop", self.w2)	#
+                #########################################
+
+                # Calculate error
+                # 1. For all the words in vocab, calculate difference between y_pred and the one-hot target word
+                # 2. The one-hot vector only has a 1 at w_t so only that entry of every row needs a subtraction
+                e = y_pred.copy()
+                e[rows, w_t] -= 1
+                #########################
+                # print("Error", e)	#
+                #########################
+
+                # Backpropagation
+                # We use SGD to backpropagate errors - calculate loss on the output layer 
+                self.backprop(e, h, contexts, c)
+                lap('update')
+                #########################################
+                #print("W1-after backprop", self.w1)	#
+                #print("W2-after backprop", self.w2)	#
+                #########################################
+
+                # Calculate loss
+                # There are 2 parts to the loss function
+                # Part 1: -ve of the actual output +
+                # Part 2: log of sum for all elements (exponential-ed) in the output layer before softmax (u)
+                # Note: u[rows, w_t] returns the value of the output layer before softmax for every target word
+                # Note: loss function is calculated after backprop in this case because u is not changed by the 
+                # backprop so the order does not matter 
+                # Note: the log of the sum comes from the softmax, so the loss costs O(B) and not another BxV exp
+                loss_weight = self.loss_weight(batch_number)
+                if loss_weight:
+                    self.loss += loss_weight * np.sum(-u[rows, w_t] + lse)
+                lap('loss')
+                monitor.batch_end(len(contexts))
+                
+                #############################################################
+                # Break if you want to see weights after first batch 		#
+                # break 													#
+                #############################################################
+
+        self.scale_sampled_loss(start_loss, monitor.batches - start_batches)
+
+    def forward_pass(self, w_c):
+        # w_c is a list of B arrays of IDs of context words, one array per target word
+        # Take the average of the rows of the context words in the first matrix (w1) to get the hidden layers - BxN
+        h, contexts, c = self.forward_pass_batch(w_c)
+        # Dot product hidden layers with second matrix (w2) - BxN @ NxV
+        u = np.matmul(h, self.w2)
+        # Run every row of u through softmax to force each element to range of [0, 1]
+        y_c, lse = self.softmax(u)
+
+        return y_c, h, u, lse, contexts, c
+
+    def forward_pass_batch(self, w_c):
+        # w_c is a list of B arrays of IDs of context words, one array per target word
+        # Take the average of the rows of the context words of every target word in the first matrix (w1) to get
+        # the hidden layers - BxN
+        c = np.array([len(context) for context in w_c])
+        contexts = np.concatenate(w_c)
+        # Note: c is cast to the dtype of w1 so that the division does not upcast h to float64
+        h = np.add.reduceat(self.w1[contexts], np.cumsum(c) - c, axis=0) / c.reshape((-1, 1)).astype(self.w1.dtype)
+
+        return h, contexts, c
+
+    def backprop(self, e, h, contexts, c):
+        # Every row of e represents the prediction errors for one target word across the entire vocabulary
         # Going backwards, we need to take derivative of E with respect of w2
-        # h - Nx1, e - shape Vx1, dl_dw2 - shape NxV
-        # x - shape Vx1, w2 - NxV, EH - Nx1
-        c = sum_x.sum()
-        dl_dw2 = np.outer(h, e)
-        EH = np.matmul(self.w2, e)
-        dl_dw1 = 1/c * np.outer(sum_x, EH)
+        # h - BxN, e - shape BxV, dl_dw2 - shape NxV (summed over the batch), EH - BxN
+        # contexts - IDs of the context words of all B target words, c - number of context words of every target word
+        dl_dw2 = np.matmul(h.T, e)
+        EH = np.matmul(e, self.w2.T)
         ########################################
         # print('Delta for w2', dl_dw2)			#
         # print('Hidden layer', h)				#
-        # print('np.dot', np.dot(self.w2, e.T))	#
-        # print('Delta for w1', dl_dw1)			#
+        # print('Error of hidden layers', EH)	#
         #########################################
 
-        # Update weights
-        self.w1 = self.w1 - (self.lr * dl_dw1)
-        self.w2 = self.w2 - (self.lr * dl_dw2)
+        # Update weights in place
+        # Note: the rows of the context words were used in the forward pass, so each of them gets 1/c of EH
+        # (see backprop_batch)
+        # Note: every column of w2 gets a gradient under full softmax so dl_dw2 stays dense,
+        # but subtracting in place avoids allocating a new NxV matrix per batch
+        # Note: dl_dw2 sums the dense gradients of all B target words, so its step is averaged over the batch - a learning
+        # rate that is stable for one target word then stays stable for a whole batch of them
+        self.backprop_batch(EH, contexts, c)
+        self.w2 -= (self.lr / len(c)) * dl_dw2
     
-    def backprop_hierarchical(self, h, sum_x, inner_units):
-        c = sum_x.sum()
-        EH = 0
-        # Updates the inner unit's output vector one by one while preparing EH
-        # in order to backpropagate the error to learn input -> hidden weights (self.w1)
-        for unit, dir in inner_units:
-            unit.vector = unit.vector - self.lr * (self.sigmoid(np.dot(unit.vector.T, h)[0][0]) - dir) * h
-            EH += (self.sigmoid(np.dot(unit.vector.T, h)[0][0])-dir) * unit.vector
-        
-        dl_dw1 = 1/c * np.outer(sum_x, EH)
-        self.w1 = self.w1 - (self.lr * dl_dw1)
-    
-    # Get vector from word
-    def word_vec(self, word):
-        w_index = self.word_index[word]
-        v_w = self.w1[w_index]
-        return v_w
-
-    # Input vector, returns nearest word(s)
-    def vec_sim(self, word, top_n):
-        v_w1 = self.word_vec(word)
-        word_sim = {}
-
-        for i in range(self.v_count):
-            if self.index_word[i] != word:
-                # Find the cosine similary score for each word in vocab except for the current word
-                v_w2 = self.w1[i]
-                theta_sum = np.dot(v_w1, v_w2)
-                theta_den = np.linalg.norm(v_w1) * np.linalg.norm(v_w2)
-                theta = theta_sum / theta_den
-
-                w2 = self.index_word[i]
-                word_sim[w2] = theta
-
-        words_sorted = sorted(word_sim.items(), key=lambda kv: kv[1], reverse=True)
+    def backprop_batch(self, EH, contexts, c):
+        # EH - BxN errors of the hidden layers, contexts - IDs of the context words of all B target words
+        # c - number of context words of every target word
+        # The hidden layer is the average of the context words, so each of them gets 1/c of the error of its target word
+        dl_dw1 = np.repeat(EH / c.reshape((-1, 1)).astype(EH.dtype), c, axis=0)
 
-        for word, sim in words_sorted[:top_n]:
-            print(word, sim)
+        # Scatter the gradient in place onto the rows of the context words (once per occurrence)
+        scatter_subtract(self.w1, contexts, self.lr * dl_dw1)
 
 
 if __name__ == '__main__':
@@ -365,8 +306,24 @@ if __name__ == '__main__':
 	'n': 10,					# dimensions of word embeddings, also refer to size of hidden layer
 	'epochs': 50,				# number of training epochs
 	'learning_rate': 0.01,		# learning rate
-    'hierarchical_softmax': True # whether or not to implement hierarchical softmax to get 
+	'batch_size': 64,			# number of target words trained together in one batch
+	'dtype': 'float32',			# floating point type of the weight matrices (float32 or float64)
+	'exp_table': False,			# whether or not to look up sigmoid in a table, with the dot products clipped to +-max_exp
+	'max_exp': 6,				# clip range of the table
+	'exp_table_size': 1000,	# number of steps of the table
+	'sample': 0,				# threshold for subsampling frequent words, e.g. 1e-3 (0 -> no subsampling)
+	'min_count': 1,				# words seen fewer times are left out of the vocabulary
+	'max_vocab_size': None,		# limit on distinct words while counting, the rarest are pruned (None -> no limit)
+    'hierarchical_softmax': True, # whether or not to implement hierarchical softmax to get 
                                  # compututational complexity of O(logV) instead of O(V)
+    'negative_samples': 0,		# number of negative samples when hierarchical_softmax is False
+                                # 0 -> normal cbow
+    'ns_exponent': 0.75,		# exponent of the unigram distribution that negative samples are drawn from
+    'table_size': 10000000,		# number of slots in the unigram table
+    'workers': 1,				# number of worker processes training in parallel
+    'timers': False,			# whether or not to time the phases of every batch (see hooks.py)
+    'loss_mode': 'exact',		# loss of every batch (exact), of every loss_every-th batch (sampled) or none (off)
+    'loss_every': 100			# batches between two losses when sampled
     }
 
     text = "natural language processing and machine learning is fun and exciting"
@@ -378,7 +335,7 @@ if __name__ == '__main__':
     # Initialise object
     cbow = word2vec_cbow(settings)
 
-    # Numpy ndarray with one-hot representation for [target_word, context_words]
+    # Corpus encoded lazily as int32 arrays of word IDs, the [target_word, context_words] samples are generated by train
     training_data = cbow.generate_training_data(corpus)
 
     # Training
@@ -390,4 +347,5 @@ if __name__ == '__main__':
     print(word, vec)
 
     # Find similar words
-    cbow.vec_sim("machine", 3)
+    for word, sim in cbow.vec_sim("machine", 3):
+        print(word, sim)
@@ -0,0 +1,291 @@
+"""
+Streaming corpus for Word2Vec. Sentences are read lazily, encoded as int32 arrays of word IDs one at a time and the
+training samples are generated on the fly, so memory stays bounded by the vocabulary, the model and one batch of
+samples whatever the size of the corpus.
+
+Note: the corpus is iterated once to build the vocabulary and once per epoch, so it has to be re-iterable
+(a list of sentences, LineSentence or EncodedCorpus) rather than a one-shot generator - check_reiterable rejects
+generators and open files, which would train on nothing after the first pass.
+"""
+
+import argparse
+import copy
+import itertools
+import os
+import numpy as np
+from collections import defaultdict
+
+# Longer lines are split into sentences of at most this many words
+MAX_SENTENCE_LENGTH = 10000
+
+# Number of word IDs buffered in memory before they are written to disk by encode_corpus
+WRITE_BUFFER_SIZE = 1000000
+
+# Raises TypeError when sentences can only be iterated once (a generator, an open file or any other iterator)
+def check_reiterable(sentences):
+    if iter(sentences) is sentences:
+        raise TypeError('the corpus is read once per epoch, so it must be re-iterable (a path, a list or a corpus '
+                        'class of corpus.py), not a one-shot %s' % type(sentences).__name__)
+
+class LineSentence:
+    def __init__(self, source, max_sentence_length=MAX_SENTENCE_LENGTH, shard=0, shards=1):
+        # source is the path of a text file or a re-iterable of lines of text (e.g. a list, not an open file)
+        if not isinstance(source, str):
+            check_reiterable(source)
+        # Every line is a sentence of lowercased, whitespace-separated words
+        # With shards > 1 only every shards-th line starting at line number shard is read (see shard_corpus)
+        self.source = source
+        self.max_sentence_length = max_sentence_length
+        self.shard = shard
+        self.shards = shards
+
+    def __iter__(self):
+        if isinstance(self.source, str):
+            with open(self.source, encoding='utf-8') as lines:
+                yield from self.split_lines(lines)
+        else:
+            yield from self.split_lines(self.source)
+
+    def sharded(self, shard, shards):
+        return LineSentence(self.source, self.max_sentence_length, shard, shards)
+
+    def split_lines(self, lines):
+        # Lines of other shards are skipped before they are lowercased and split
+        for line in itertools.islice(lines, self.shard, None, self.shards):
+            words = line.lower().split()
+            for i in range(0, len(words), self.max_sentence_length):
+                yield words[i:i + self.max_sentence_length]
+
+class EncodedCorpus:
+    def __init__(self, sentences, word_index):
+        # sentences is a re-iterable of lists of words, word_index maps every word in the vocabulary to its ID
+        check_reiterable(sentences)
+        self.sentences = sentences
+        self.word_index = word_index
+
+    def __iter__(self):
+        # Encode one sentence at a time as int32 word IDs - words outside the vocabulary are dropped
+        # Note: unknown words get the ID -1 with a single dictionary lookup per word and are masked out at once
+        get = self.word_index.get
+        for sentence in self.sentences:
+            sent_ids = np.array([get(word, -1) for word in sentence], dtype=np.int32)
+            sent_ids = sent_ids[sent_ids >= 0]
+            #####################################
+            # print(sent_ids)					#
+            # [1 2 3 0 4 5 6 7 0 8]				#
+            #####################################
+
+            # A sentence needs at least 2 words to have a context
+            if len(sent_ids) > 1:
+                yield sent_ids
+
+    # Shards the sentences before they are encoded, so every worker only encodes its own shard
+    def sharded(self, shard, shards):
+        return EncodedCorpus(shard_corpus(self.sentences, shard, shards), self.word_index)
+
+class MemmapCorpus:
+    def __init__(self, prefix):
+        # Corpus written by encode_corpus - the word IDs of all the sentences in prefix.ids (little-endian int32)
+        # and the position of the first word of every sentence in prefix.offsets (little-endian int64)
+        # Both files are memory-mapped, so opening the corpus is instant and the pages are shared across processes
+        self.prefix = prefix
+        self.open_maps()
+
+        # Sentences start to stop of the corpus are read (all of them unless sharded)
+        self.start = 0
+        self.stop = len(self.offsets) - 1
+
+    def open_maps(self):
+        # A corpus without any sentence of 2 words or more has an empty .ids file, which cannot be memory-mapped
+        if os.path.getsize(self.prefix + '.ids') == 0:
+            self.ids = np.zeros(0, dtype='<i4')
+        else:
+            self.ids = np.memmap(self.prefix + '.ids', dtype='<i4', mode='r')
+        self.offsets = np.memmap(self.prefix + '.offsets', dtype='<i8', mode='r')
+
+    # A pickled corpus (e.g. sent to a worker process) holds the prefix and the range of sentences, not the word IDs,
+    # and maps the files again when it is unpickled
+    def __getstate__(self):
+        return {'prefix': self.prefix, 'start': self.start, 'stop': self.stop}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.open_maps()
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def __iter__(self):
+        # Every sentence is a slice of the memory map, no copy is made
+        for i in range(self.start, self.stop):
+            sent_ids = self.ids[self.offsets[i]:self.offsets[i+1]]
+            if len(sent_ids) > 1:
+                yield sent_ids
+
+    # Shard number shard of shards contiguous ranges of sentences with about the same number of words each
+    # Note: the ranges are found by a binary search of the offsets, so no sentence is read to shard the corpus
+    def sharded(self, shard, shards):
+        first, last = self.offsets[self.start], self.offsets[self.stop]
+        bounds = np.searchsorted(self.offsets[self.start:self.stop + 1], first + (last - first) * np.array([shard, shard + 1]) // shards)
+
+        corpus = copy.copy(self)
+        corpus.start, corpus.stop = self.start + int(bounds[0]), self.start + int(bounds[1])
+        return corpus
+
+class ShardedCorpus:
+    def __init__(self, sentences, shard, shards):
+        # Every shards-th sentence of a corpus starting at sentence number shard, so that shards workers
+        # together cover the whole corpus once without sharing a sentence
+        self.sentences = sentences
+        self.shard = shard
+        self.shards = shards
+
+    def __iter__(self):
+        yield from itertools.islice(self.sentences, self.shard, None, self.shards)
+
+# Shard number shard of shards of a corpus, so that shards workers together cover the whole corpus once
+# Corpora with a sharded method split themselves before any work is done per sentence - LineSentence skips the lines
+# of other shards before tokenising them, EncodedCorpus before encoding them and MemmapCorpus reads a contiguous
+# range of sentences - any other re-iterable corpus is wrapped in ShardedCorpus
+def shard_corpus(sentences, shard, shards):
+    if hasattr(sentences, 'sharded'):
+        return sentences.sharded(shard, shards)
+
+    return ShardedCorpus(sentences, shard, shards)
+
+# Encodes a corpus once into prefix.ids, prefix.offsets and prefix.vocab (see MemmapCorpus and load_vocab)
+# sentences is a re-iterable of lists of words - it is read twice, once to count the words and once to encode them
+# min_count and max_vocab_size prune the vocabulary like they do in training (see count_words and sort_vocab)
+# Returns the word counts in ID order
+def encode_corpus(sentences, prefix, min_count=1, max_vocab_size=None):
+    check_reiterable(sentences)
+    word_counts = sort_vocab(count_words(sentences, max_vocab_size), min_count)
+    word_index = dict((word, i) for i, word in enumerate(word_counts))
+
+    # Vocabulary file - one word and its count per line, in ID order
+    write_vocab(word_counts, prefix)
+
+    # Write the word IDs and the sentence offsets in blocks of about WRITE_BUFFER_SIZE words so memory stays bounded
+    with open(prefix + '.ids', 'wb') as ids_file, open(prefix + '.offsets', 'wb') as offsets_file:
+        position, flushed = 0, 0
+        offsets_file.write(np.array([position], dtype='<i8').tobytes())
+
+        buffer, offsets = [], []
+        for sent_ids in EncodedCorpus(sentences, word_index):
+            position += len(sent_ids)
+            buffer.append(sent_ids)
+            offsets.append(position)
+
+            if position - flushed >= WRITE_BUFFER_SIZE:
+                ids_file.write(np.concatenate(buffer).astype('<i4').tobytes())
+                offsets_file.write(np.array(offsets, dtype='<i8').tobytes())
+                buffer, offsets, flushed = [], [], position
+
+        if buffer:
+            ids_file.write(np.concatenate(buffer).astype('<i4').tobytes())
+            offsets_file.write(np.array(offsets, dtype='<i8').tobytes())
+
+    return word_counts
+
+# Writes the vocabulary file prefix.vocab - one word and its count per line, in ID order
+def write_vocab(word_counts, prefix):
+    with open(prefix + '.vocab', 'w', encoding='utf-8') as f:
+        for word, count in word_counts.items():
+            f.write('%s %d\n' % (word, count))
+
+# Reads the vocabulary file written by encode_corpus
+# Returns the word counts in ID order, ready for build_vocab
+# Note: words never contain whitespace, so the whole file is split at once into alternating words and counts
+def load_vocab(prefix):
+    with open(prefix + '.vocab', encoding='utf-8') as f:
+        fields = f.read().split()
+
+    return dict(zip(fields[0::2], map(int, fields[1::2])))
+
+# Find unique word counts using dictonary in one pass over the corpus
+# With max_vocab_size, the rarest words are pruned whenever there are more than max_vocab_size distinct words,
+# like ReduceVocab of the original C implementation, so that memory stays bounded on noisy text
+def count_words(sentences, max_vocab_size=None):
+    word_counts = defaultdict(int)
+    min_reduce = 1
+    for row in sentences:
+        for word in row:
+            word_counts[word] += 1
+
+        # Every pruning drops the words seen at most min_reduce times and raises the bar for the next one
+        while max_vocab_size and len(word_counts) > max_vocab_size:
+            prune_vocab(word_counts, min_reduce)
+            min_reduce += 1
+
+    return word_counts
+
+# Removes the words with a count of at most min_reduce in place
+def prune_vocab(word_counts, min_reduce):
+    for word in [word for word, count in word_counts.items() if count <= min_reduce]:
+        del word_counts[word]
+
+# Keeps the words with a count of at least min_count, sorted by descending count (ties keep their first-seen order)
+# The position of a word is its ID, so the rows of the most trained words sit next to each other in memory
+def sort_vocab(word_counts, min_count=1):
+    words = sorted((word for word, count in word_counts.items() if count >= min_count), key=lambda word: -word_counts[word])
+
+    return dict((word, word_counts[word]) for word in words)
+
+# Probability of keeping each occurrence of every word when subsampling frequent words (Mikolov et al.)
+# word_counts - count of every word in ID order, sample - threshold on the frequency of a word, e.g. 1e-3 to 1e-5
+# Words more frequent than sample are kept with a probability that falls with the square root of their frequency
+def keep_probabilities(word_counts, sample):
+    counts = np.asarray(word_counts, dtype=np.float64)
+    threshold = sample * counts.sum()
+
+    return np.minimum((np.sqrt(counts / threshold) + 1) * threshold / counts, 1.0)
+
+# Drops every word of a corpus of int32 word ID arrays with probability 1 - keep_probs[word]
+# The keep mask of a sentence is drawn anew on every pass, so every epoch sees a different subsample
+def subsample(sentences, keep_probs):
+    for sent_ids in sentences:
+        sent_ids = sent_ids[np.random.random(len(sent_ids)) < keep_probs[sent_ids]]
+        if len(sent_ids) > 1:
+            yield sent_ids
+
+# Generates the training samples [w_target, w_context] of a corpus of int32 word ID arrays on the fly
+# w_target is the ID of the target word and w_context is an int32 array with the IDs of its context words
+def iter_windows(sentences, window):
+    for sent_ids in sentences:
+        for i in range(len(sent_ids)):
+            # Context window is the slice on the left and the slice on the right of the target word
+            # Note: window_size 2 will have range of 5 values (the target word itself is left out)
+            # Note: slicing clips at the start and end of the sentence so there is no index out of range
+            w_context = np.concatenate((sent_ids[max(i - window, 0):i], sent_ids[i+1:i + window+1]))
+            #################################################################################################
+            # Example:																						#
+            # [Target] natural, [Context] language, [Context] processing									#
+            # [1, array([2, 3], dtype=int32)]																#
+            #################################################################################################
+            yield int(sent_ids[i]), w_context
+
+# Groups the training samples of iter_windows into lists of batch_words samples
+def iter_batches(sentences, window, batch_words):
+    batch = []
+    for sample in iter_windows(sentences, window):
+        batch.append(sample)
+        if len(batch) == batch_words:
+            yield batch
+            batch = []
+
+    if batch:
+        yield batch
+
+
+if __name__ == '__main__':
+    # Encode a raw text corpus once so that every training run can memory-map it with MemmapCorpus
+    # Usage: python corpus.py corpus.txt corpus
+    parser = argparse.ArgumentParser(description='Encode a text corpus (one sentence per line) into word ID files')
+    parser.add_argument('input', help='text file to encode')
+    parser.add_argument('prefix', help='output prefix of the .ids, .offsets and .vocab files')
+    parser.add_argument('--min-count', type=int, default=1, help='drop the words seen fewer times')
+    parser.add_argument('--max-vocab-size', type=int, help='prune the rarest words while counting above this many words')
+    args = parser.parse_args()
+
+    word_counts = encode_corpus(LineSentence(args.input), args.prefix, args.min_count, args.max_vocab_size)
+    print('Encoded %d words with a vocabulary of %d words' % (sum(word_counts.values()), len(word_counts)))
@@ -0,0 +1,61 @@
+"""
+Accuracy of trained word vectors on word analogies, in the questions-words.txt format of the original C implementation
+(https://code.google.com/archive/p/word2vec/): a line starting with ':' names a section and every other line is a
+question "a b c d", read as "a is to b as c is to d".
+"""
+
+# Number of questions answered per call of analogy_batch
+EVAL_BATCH_SIZE = 10000
+
+# Reads an analogy file
+# Returns a list of (section, questions) with every question a tuple of 4 lowercased words
+def read_analogies(path):
+    sections = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith(':'):
+                sections.append((line[1:].strip(), []))
+                continue
+            if not sections:
+                sections.append(('', []))
+
+            words = tuple(line.lower().split())
+            if len(words) == 4:
+                sections[-1][1].append(words)
+
+    return sections
+
+# Answers every question with the top answer of the model (method - '3cosadd' or '3cosmul')
+# Questions with a word outside the vocabulary of the model are skipped
+# Returns a list of (section, correct, answered, skipped)
+def analogy_accuracy(model, path, method='3cosadd'):
+    results = []
+    for section, questions in read_analogies(path):
+        known = [question for question in questions if all(word in model.word_index for word in question)]
+
+        correct = 0
+        for i in range(0, len(known), EVAL_BATCH_SIZE):
+            batch = known[i:i + EVAL_BATCH_SIZE]
+            answers = model.analogy_batch([question[:3] for question in batch], 1, method)
+            correct += sum(1 for question, answer in zip(batch, answers) if answer and answer[0][0] == question[3])
+
+        results.append((section, correct, len(known), len(questions) - len(known)))
+
+    return results
+
+# Prints the accuracy of every section and of all the sections together, like compute-accuracy of the C tool
+# Returns the accuracy over all the answered questions
+def analogy_report(model, path, method='3cosadd'):
+    results = analogy_accuracy(model, path, method)
+    for section, correct, answered, skipped in results:
+        print('%-30s %6.2f%%  (%d / %d, %d skipped)' % (section, 100 * correct / max(answered, 1), correct, answered, skipped))
+
+    correct = sum(result[1] for result in results)
+    answered = sum(result[2] for result in results)
+    skipped = sum(result[3] for result in results)
+    print('%-30s %6.2f%%  (%d / %d, %d skipped)' % ('Total', 100 * correct / max(answered, 1), correct, answered, skipped))
+
+    return correct / max(answered, 1)
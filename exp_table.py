@@ -0,0 +1,44 @@
+"""
+Precomputed sigmoid and log-sigmoid tables for negative sampling and hierarchical softmax, like EXP_TABLE of the
+original C implementation (https://code.google.com/archive/p/word2vec/). Dot products outside [-max_exp, max_exp]
+are clipped to the ends of the tables, so saturated dot products can neither overflow nor give an infinite loss.
+
+Note: NumPy evaluates np.exp over a whole batch at once, so unlike in C the lookup is not faster than the exact
+functions - the tables bound the activations and the loss of saturated dot products.
+"""
+
+import numpy as np
+
+# Dot products are clipped to [-MAX_EXP, MAX_EXP]
+MAX_EXP = 6
+
+# Number of steps of the tables over [-MAX_EXP, MAX_EXP]
+EXP_TABLE_SIZE = 1000
+
+# Exact sigmoid(x), computed as exp(min(x, 0)) / (1 + exp(-|x|)) so that it never overflows
+def sigmoid(x):
+    return np.exp(np.minimum(x, 0)) / (1 + np.exp(-np.abs(x)))
+
+# Exact log(sigmoid(x)), computed as min(x, 0) - log(1 + exp(-|x|)) so that it never overflows
+def log_sigmoid(x):
+    return np.minimum(x, 0) - np.log1p(np.exp(-np.abs(x)))
+
+class ExpTable:
+    def __init__(self, max_exp=MAX_EXP, size=EXP_TABLE_SIZE, dtype=np.float32):
+        # Values of sigmoid and log-sigmoid at size + 1 evenly spaced points from -max_exp to max_exp
+        self.max_exp = max_exp
+        self.scale = size / (2 * max_exp)
+        x = np.linspace(-max_exp, max_exp, size + 1)
+        self.sigmoid_table = sigmoid(x).astype(dtype)
+        self.log_sigmoid_table = log_sigmoid(x).astype(dtype)
+
+    # Position of the closest point of the tables to every value of x, after clipping x to [-max_exp, max_exp]
+    # Note: np.fmax and np.fmin also map NaN (weights that diverged) to an end of the tables instead of an invalid index
+    def index(self, x):
+        return ((np.fmin(np.fmax(x, -self.max_exp), self.max_exp) + self.max_exp) * self.scale + 0.5).astype(np.intp)
+
+    def sigmoid(self, x):
+        return self.sigmoid_table[self.index(x)]
+
+    def log_sigmoid(self, x):
+        return self.log_sigmoid_table[self.index(x)]
@@ -2,83 +2,128 @@
 Implementation of Hoffman Binary Tree (Encoding) in the context of Word2Vec
 Reference: https://stackoverflow.com/questions/11587044/how-can-i-create-a-tree-for-huffman-encoding-and-decoding,
 https://en.wikipedia.org/wiki/Huffman_coding
+
+The tree is stored in arrays like the original C implementation (https://code.google.com/archive/p/word2vec/):
+node IDs 0 to V-1 are the words (leaves) and node IDs V to 2V-2 are the inner units in the order they were created,
+so the root is node 2V-2. Inner unit i (node V+i) owns row i of a (V-1)xN weight matrix.
 """
 
 import numpy as np
-import queue
-from itertools import count
+from scatter import scatter_subtract
 
-class TreeNode:
-    def __init__(self, vector=None, left=None, right=None):
-        # Vector of inner units
-        self.vector = vector
+# Creates a Hoffman binary tree based on word frequencies
+# word_counts - count of every word in ID order
+# Returns the parent node and the direction from the parent (left is coded as 1 and right coded as 0) of every node
+def create_tree(word_counts):
+    word_counts = [int(c) for c in word_counts]
+    v_count = len(word_counts)
+    parent = np.zeros(max(2 * v_count - 1, 1), dtype=np.int32)
+    binary = np.zeros(max(2 * v_count - 1, 1), dtype=np.int8)
+
+    # Two-queue construction: the leaves sorted by count and the inner units in the order they are created.
+    # Inner units are created with non-decreasing counts, so the two lowest nodes are always at the front of
+    # one of the two queues and no priority queue is needed
+    # Note: equal counts are taken from the leaves first and then in order of creation
+    leaves = sorted(range(v_count), key=lambda w: word_counts[w])
+    inner_counts = []
+    i_leaf, i_inner = 0, 0
+
+    # Remove the lowest node from the front of either queue
+    def pop():
+        nonlocal i_leaf, i_inner
+        if i_inner >= len(inner_counts) or (i_leaf < v_count and word_counts[leaves[i_leaf]] <= inner_counts[i_inner]):
+            i_leaf += 1
+            return leaves[i_leaf - 1], word_counts[leaves[i_leaf - 1]]
+        i_inner += 1
+        return v_count + i_inner - 1, inner_counts[i_inner - 1]
+
+    for i in range(v_count - 1):        # 1. While there is more than one node
+        l, l_count = pop()              # 2a. remove two lowest nodes
+        r, r_count = pop()
+        node = v_count + i              # 2b. create internal node with children
+        parent[l], binary[l] = node, 1
+        parent[r], binary[r] = node, 0
+        inner_counts.append(l_count + r_count)  # 2c. add new node to queue
+
+    return parent, binary               # 3. tree is complete
 
-        # left node
-        self.left = left
+# Creates Hoffman coding based on the tree paths
+# Returns points (IDs of the inner units from the root to the word), codes (direction taken at every inner unit)
+# and code_lens (length of the path) of every word - points and codes are padded with 0 after code_lens
+def create_code(parent, binary, v_count):
+    root = 2 * v_count - 2
+
+    # Walk up the tree from all the leaves at once to get the length of every path,
+    # keeping only the words that have not reached the root yet
+    code_lens = np.zeros(v_count, dtype=np.int32)
+    words = np.arange(v_count)
+    node = words[words != root]
+    words = words[words != root]
+    while len(words) > 0:
+        code_lens[words] += 1
+        node = parent[node]
+        words, node = words[node != root], node[node != root]
+
+    max_len = int(code_lens.max()) if v_count > 0 else 0
+    points = np.zeros((v_count, max_len), dtype=np.int32)
+    codes = np.zeros((v_count, max_len), dtype=np.int8)
+
+    # Walk up again and fill in the paths from the end, so that they read from the root to the word
+    words = np.flatnonzero(code_lens)
+    node = words
+    pos = code_lens[words] - 1
+    while len(words) > 0:
+        codes[words, pos] = binary[node]
+        node = parent[node]
+        points[words, pos] = node - v_count
+        words, node, pos = words[pos > 0], node[pos > 0], pos[pos > 0] - 1
+
+    return points, codes, code_lens
+
+# Creates the (V-1)xN weight matrix of the inner units
+def create_inner_units(v_count, n, random_seed=0, dtype=np.float32):
+    np.random.seed(random_seed)
 
-        # right node
-        self.right = right
-    
-    def children(self):
-        return((self.left, self.right))
+    return np.random.uniform(-1, 1, (max(v_count - 1, 0), n)).astype(dtype)
 
-# Creates a Hoffman binary tree based on word frequencies
-def create_tree(word_counts, n, random_seed=0):
-    p = queue.PriorityQueue()
-    np.random.seed(random_seed)
+# Returns the inner units and path directions of a word
+def get_path_nodes(word_id, points, codes, code_lens):
+    length = code_lens[word_id]
 
-    # Create an index to deal with equal frequency comparisons
-    index = count(0)                    
-    for w, c in word_counts.items():    # 1. Create a leaf node for each symbol
-        p.put((c, next(index), w))      # and add it to the priority queue
+    return points[word_id, :length], codes[word_id, :length]
 
-    while p.qsize() > 1:                # 2. While there is more than one node
-        l, r = p.get(), p.get()         # 2a. remove two highest nodes
-        init_vector = np.random.uniform(-1, 1, (n, 1))
-        node = TreeNode(vector=init_vector, left=l, right=r)        # 2b. create internal node with children
-        p.put((l[0]+r[0], next(index), node))                       # 2c. add new node to queue      
+# Trains the inner units on the paths of a batch of words with hierarchical softmax
+# h - BxN hidden layers, word_ids - B words whose paths are trained, sigmoid - activation of the inner units,
+# log_sigmoid - log of the activation for the loss, compute_loss - False skips the loss (returned as 0)
+# The inner units are updated in place, returns the loss and EH (BxN), the error to backpropagate to the hidden layers
+def hierarchical_softmax(inner_units, points, codes, code_lens, h, word_ids, lr, sigmoid, log_sigmoid, compute_loss=True):
+    # Gather the paths of all the words at once, padded to the longest path in the batch - BxL
+    lens = code_lens[word_ids]
+    max_len = int(lens.max()) if len(lens) > 0 else 0
+    path = points[word_ids, :max_len]
+    code = codes[word_ids, :max_len]
+    mask = np.arange(max_len) < lens.reshape((-1, 1))
 
-    return p.get()                      # 3. tree is complete - return root node
+    # Forward pass through every inner unit on the paths - BxLxN vectors, BxL outputs
+    vectors = inner_units[path]
+    u = np.einsum('bn,bln->bl', h, vectors)
+    f = sigmoid(u)
 
-# Creates Hoffman coding based on the tree paths
-def create_code(root):
-    code_dict = {}
-    traverse_helper(root, [], code_dict)
-
-    return code_dict
-
-# Recursive helper function to traverse the Hoffman tree
-def traverse_helper(node, code, ret_dict):
-    if type(node[2]) == str:
-        # print(node, code)
-        temp = code.copy()  # Prevents code from changing in-place
-        ret_dict[node[2]] = temp
-        code.pop()
-        
-        return
-    
-    # Left is coded as 1 and right coded as 0
-    traverse_helper(node[2].left, code + [1], ret_dict)
-    traverse_helper(node[2].right, code + [0], ret_dict)
-
-# Returns a tuple of tree nodes and path direction based on an input word
-def get_path_nodes(word, code_dict, root):
-    code = code_dict[word]
-    nodes = []
-    cur = root[2]
-
-    for direction in code:
-        nodes.append((cur, direction))
-
-         # Left is coded as 1
-        if direction == 1:
-            cur = cur.left[2]
-        
-        # Right is coded as 0
-        else:
-            cur = cur.right[2]
-
-    return nodes
+    # Calculate loss
+    # Left (code 1) contributes -log(sigmoid(u)) and right (code 0) contributes -log(sigmoid(-u)) = -log(1 - sigmoid(u))
+    # Note: log(sigmoid(-u)) is taken directly rather than from 1 - f, which rounds to exactly 0 for large u in float32
+    loss = -np.sum(log_sigmoid(np.where(code == 1, u, -u))[mask]) if compute_loss else 0.0
+
+    # Backpropagation
+    # Error of every inner unit is sigmoid(u) - code, with the padding after the end of a path masked out
+    e = (f - code) * mask
+    EH = np.einsum('bl,bln->bn', e, vectors)
+
+    # Update the inner units on the paths in place (accumulating the units shared by several words)
+    grad = lr * e[:, :, None] * h[:, None, :]
+    scatter_subtract(inner_units, path[mask], grad[mask])
+
+    return loss, EH
 
 
 if __name__ == '__main__':
@@ -88,16 +133,15 @@ if __name__ == '__main__':
     (8.167, 'a'), (1.492, 'b'), (2.782, 'c'), (4.253, 'd'),
     (12.702, 'e'),(2.228, 'f'), (2.015, 'g'), (6.094, 'h'),
     (6.966, 'i'), (0.153, 'j'), (0.747, 'k'), (4.025, 'l'),
-    (2.406, 'm'), (6.749, 'n'), (7.507, 'o'), (1.929, 'p'), 
-    (0.095, 'q'), (5.987, 'r'), (6.327, 's'), (9.056, 't'), 
+    (2.406, 'm'), (6.749, 'n'), (7.507, 'o'), (1.929, 'p'),
+    (0.095, 'q'), (5.987, 'r'), (6.327, 's'), (9.056, 't'),
     (2.758, 'u'), (1.037, 'v'), (2.365, 'w'), (0.150, 'x'),
     (1.974, 'y'), (0.074, 'z') ]
 
     freq = dict(freq)
     freq = dict((v,k) for k,v in freq.items())
 
-    root = create_tree(word_counts, 10)
-    code_dict = create_code(root)
-    nodes = get_path_nodes('processing', code_dict, root)
-    
+    parent, binary = create_tree(word_counts.values())
+    points, codes, code_lens = create_code(parent, binary, len(word_counts))
+    nodes = get_path_nodes(list(word_counts).index('processing'), points, codes, code_lens)
 
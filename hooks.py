@@ -0,0 +1,168 @@
+"""
+Instrumentation of training - callbacks on the events of training and optional per-phase timers.
+
+A callback subclasses Callback, overrides the events it needs and is registered with add_callback of a model.
+With 'timers' set in settings, the time of every batch is split into the phases of training:
+    batch   - generating the training samples of the batch and its (target, context) pairs
+    forward - hidden layers (and the outputs of the full softmax)
+    sample  - drawing the negative samples
+    output  - forward pass, loss and update of the output layer of negative sampling and hierarchical softmax
+    update  - errors and backpropagation into w1 (and into w2 under the full softmax)
+    loss    - loss of the full softmax
+Without callbacks and timers the training loops only count the words and pairs they train.
+
+Note: with several workers the epoch, batch and timer events happen in the worker processes and are not reported -
+callbacks get on_train_start, on_stats with the words trained by all the workers and on_train_end, and the pairs
+trained are None.
+"""
+
+import json
+import time
+import numpy as np
+from collections import defaultdict
+
+# Seconds between two calls of on_stats
+STATS_INTERVAL = 1.0
+
+class Callback:
+    # Base class of training callbacks, every event does nothing by default
+    # stats is the dict of TrainingMonitor.stats
+    def on_train_start(self, model):
+        pass
+
+    def on_epoch_start(self, model, epoch):
+        pass
+
+    # pairs - number of (target, context) pairs trained by the batch
+    def on_batch_end(self, model, pairs):
+        pass
+
+    def on_epoch_end(self, model, epoch, stats):
+        pass
+
+    # Called every STATS_INTERVAL seconds while training
+    def on_stats(self, model, stats):
+        pass
+
+    def on_train_end(self, model, stats):
+        pass
+
+class MetricsLogger(Callback):
+    def __init__(self, path):
+        # Metrics sink - appends the stats of every on_stats, on_epoch_end and on_train_end to the file at path,
+        # one JSON object per line with the name of the event
+        self.path = path
+
+    def write(self, event, stats):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(dict(stats, event=event)) + '\n')
+
+    def on_stats(self, model, stats):
+        self.write('stats', stats)
+
+    def on_epoch_end(self, model, epoch, stats):
+        self.write('epoch_end', stats)
+
+    def on_train_end(self, model, stats):
+        self.write('train_end', stats)
+
+class TrainingMonitor:
+    def __init__(self, model, callbacks=(), timers=False, stats_interval=STATS_INTERVAL):
+        # Counters of one training run, the time of every phase and the callbacks they are reported to
+        self.model = model
+        self.callbacks = list(callbacks)
+        self.stats_interval = stats_interval
+        self.total_words = 0
+        self.epoch = 0
+        self.words = 0
+        self.pairs = 0
+        self.batches = 0
+        self.times = defaultdict(float)
+        self.start = self.last_lap = self.last_stats = time.perf_counter()
+
+        # Unused timers cost a call to a function that does nothing per phase
+        self.lap = self.time_phase if timers else self.skip_phase
+
+    # Adds the time since the previous lap to phase
+    def time_phase(self, phase):
+        now = time.perf_counter()
+        self.times[phase] += now - self.last_lap
+        self.last_lap = now
+
+    def skip_phase(self, phase):
+        pass
+
+    # Yields the sentences of the corpus, counting the words read (before subsampling, like the C implementation)
+    # The first lap of an epoch starts when its first sentence is read
+    def count_words(self, sentences):
+        self.last_lap = time.perf_counter()
+        for sent_ids in sentences:
+            yield sent_ids
+            self.words += len(sent_ids)
+
+    def train_start(self):
+        self.total_words = int(np.sum(self.model.word_counts)) * self.model.epochs
+        self.start = self.last_lap = self.last_stats = time.perf_counter()
+        for callback in self.callbacks:
+            callback.on_train_start(self.model)
+
+    def epoch_start(self, epoch):
+        self.epoch = epoch
+        for callback in self.callbacks:
+            callback.on_epoch_start(self.model, epoch)
+
+    def batch_end(self, pairs):
+        self.pairs += pairs
+        self.batches += 1
+
+        # The batch updated the weights, so a normalised copy of w1 or an index built by a callback is stale
+        self.model.w1_norm = None
+        self.model.index = None
+        if not self.callbacks:
+            return
+
+        for callback in self.callbacks:
+            callback.on_batch_end(self.model, pairs)
+
+        now = time.perf_counter()
+        if now - self.last_stats >= self.stats_interval:
+            self.last_stats = now
+            self.report()
+
+    def epoch_end(self, epoch):
+        if self.callbacks:
+            stats = self.stats()
+            for callback in self.callbacks:
+                callback.on_epoch_end(self.model, epoch, stats)
+
+    def train_end(self, **overrides):
+        stats = dict(self.stats(), **overrides)
+        for callback in self.callbacks:
+            callback.on_train_end(self.model, stats)
+
+        return stats
+
+    # Calls on_stats of every callback - overrides replace entries of the stats (e.g. the pairs, which train_parallel does not count)
+    def report(self, **overrides):
+        stats = dict(self.stats(), **overrides)
+        for callback in self.callbacks:
+            callback.on_stats(self.model, stats)
+
+    # Statistics of the run so far - words read, pairs trained, speed, current learning rate and loss of the epoch,
+    # and the seconds spent in every phase when timed
+    def stats(self):
+        elapsed = time.perf_counter() - self.start
+
+        return {
+            'epoch': self.epoch,
+            'words': self.words,
+            'total_words': self.total_words,
+            'pairs': self.pairs,
+            'batches': self.batches,
+            'elapsed': elapsed,
+            'words_per_sec': self.words / max(elapsed, 1e-9),
+            'pairs_per_sec': self.pairs / max(elapsed, 1e-9),
+            'lr': float(self.model.lr),
+            'loss': float(np.sum(getattr(self.model, 'loss', 0))),
+            'times': dict(self.times),
+        }
@@ -0,0 +1,43 @@
+"""
+Linear decay of the learning rate, like the original C implementation - the learning rate falls from the starting
+learning rate towards 0 over all the words of all the epochs of training, and is updated every LR_UPDATE_WORDS words.
+Serial training counts the words with WordCount, the workers of parallel.py share a count in shared memory.
+"""
+
+import numpy as np
+
+# Number of words trained between two updates of the word count and the learning rate
+LR_UPDATE_WORDS = 10000
+
+# The learning rate decays linearly but never below this fraction of the starting learning rate
+MIN_LR_FRACTION = 0.0001
+
+class WordCount:
+    def __init__(self):
+        # Number of words trained so far by the one process that trains
+        self.value = 0
+
+    # Adds words to the count and returns the new count
+    def add(self, words):
+        self.value += words
+
+        return self.value
+
+# Learning rate after done out of total_words words
+def decayed_lr(start_lr, done, total_words):
+    return start_lr * max(1 - done / (total_words + 1), MIN_LR_FRACTION)
+
+# Yields the sentences of an epoch while adding the number of words trained to model.words_done (see WordCount)
+# and lowering model.lr linearly from model.start_lr over all the words of training
+def decay_learning_rate(model, sentences):
+    total_words = int(np.sum(model.word_counts)) * model.epochs
+    local_words = 0
+    for sent_ids in sentences:
+        yield sent_ids
+
+        local_words += len(sent_ids)
+        if local_words >= LR_UPDATE_WORDS:
+            model.lr = decayed_lr(model.start_lr, model.words_done.add(local_words), total_words)
+            local_words = 0
+
+    model.words_done.add(local_words)
@@ -0,0 +1,305 @@
+"""
+What the skip-gram and CBOW models share - the settings of training, the vocabulary, the training loop and its
+callbacks, the sigmoid and softmax functions, saving and loading, and the similarity and analogy queries.
+A model subclasses Word2VecBase, reads the settings of its objective in __init__ and implements init_weights and
+train_epoch (see skipgram.py and cbow.py).
+"""
+
+import numpy as np
+from corpus import EncodedCorpus, check_reiterable, count_words, sort_vocab, keep_probabilities
+from hoffman_binary import create_tree, create_code
+from similarity import normalize_rows, top_k, analogy
+from ann import IVFIndex, N_PROBE
+from exp_table import ExpTable, MAX_EXP, EXP_TABLE_SIZE, sigmoid, log_sigmoid
+from model_io import save_model, load_model, save_word2vec_format, load_word2vec_format
+
+class Word2VecBase:
+    def __init__(self, settings):
+        # Kept to be saved with the model
+        self.settings = settings
+        self.n = settings['n']
+        # The learning rate decays linearly from start_lr over training, lr is the current one (see learning_rate.py)
+        self.start_lr = settings['learning_rate']
+        self.lr = self.start_lr
+        self.epochs = settings['epochs']
+        self.window = settings['window_size']
+        # Negative samples are drawn from the unigram distribution raised to ns_exponent,
+        # stored as a table of table_size word IDs
+        # Note: negative_samples and hierarchical_softmax are read by every model, as each defaults to its own objective
+        self.ns_exponent = settings.get('ns_exponent', 0.75)
+        self.table_size = settings.get('table_size', 10000000)
+        # Number of target words that are trained together in one batch
+        self.batch_size = settings.get('batch_size', 64)
+        # Floating point type of the weight matrices and of all the computations of training
+        self.dtype = np.dtype(settings.get('dtype', 'float32'))
+        # Optional lookup tables of sigmoid and log-sigmoid for negative sampling and hierarchical softmax, with the dot
+        # products clipped to [-max_exp, max_exp] (None -> exact functions)
+        self.exp_table = None
+        if settings.get('exp_table', False):
+            self.exp_table = ExpTable(settings.get('max_exp', MAX_EXP), settings.get('exp_table_size', EXP_TABLE_SIZE), self.dtype)
+        # Threshold for subsampling frequent words, 0 -> every occurrence of every word is trained
+        self.sample = settings.get('sample', 0)
+        # Words seen fewer than min_count times are left out of the vocabulary, and while counting the rarest words are
+        # pruned whenever there are more than max_vocab_size distinct words (None -> no limit)
+        self.min_count = settings.get('min_count', 1)
+        self.max_vocab_size = settings.get('max_vocab_size', None)
+        # Number of worker processes training in parallel on shared weights (see parallel.py)
+        self.workers = settings.get('workers', 1)
+        # Whether to time the phases of every batch (see hooks.py)
+        self.timers = settings.get('timers', False)
+        # Loss of training - 'exact' computes the loss of every batch, 'sampled' only the loss of every loss_every-th
+        # batch (scaled up to an estimate of the loss of the epoch), 'off' skips it
+        self.loss_mode = settings.get('loss_mode', 'exact')
+        self.loss_every = settings.get('loss_every', 100)
+        if self.loss_mode not in ('exact', 'sampled', 'off'):
+            raise ValueError("loss_mode must be 'exact', 'sampled' or 'off', not %r" % self.loss_mode)
+        if self.loss_every < 1:
+            raise ValueError('loss_every must be at least 1, not %r' % self.loss_every)
+
+        # Callbacks on the events of training (see add_callback), the monitor of the current training run and the
+        # statistics of the last one
+        self.callbacks = []
+        self.monitor = None
+        self.stats = None
+        # Count of the words trained in the current training run, which the learning rate decays with
+        self.words_done = None
+
+        # L2-normalised copy of w1 for the similarity queries, built on the first query after training
+        self.w1_norm = None
+        # Optional approximate nearest neighbour index of w1 answering the similarity queries (see build_index)
+        self.index = None
+
+    def generate_training_data(self, corpus):
+        # The corpus is read here and again every epoch, so a one-shot iterator is rejected before the first pass
+        check_reiterable(corpus)
+
+        # Find unique word counts using dictonary in one pass over the corpus
+        word_counts = count_words(corpus, self.max_vocab_size)
+        #########################################################################################################################################################
+        # print(word_counts)																																	#
+        # # defaultdict(<class 'int'>, {'natural': 1, 'language': 1, 'processing': 1, 'and': 2, 'machine': 1, 'learning': 1, 'is': 1, 'fun': 1, 'exciting': 1})	#
+        #########################################################################################################################################################
+
+        # Drop the words seen fewer than min_count times and sort the rest by descending count, so that the IDs
+        # of the most frequent words come first
+        word_counts = sort_vocab(word_counts, self.min_count)
+        #################################################################################################################################
+        # print(word_counts)																											#
+        # {'and': 2, 'natural': 1, 'language': 1, 'processing': 1, 'machine': 1, 'learning': 1, 'is': 1, 'fun': 1, 'exciting': 1}	#
+        #################################################################################################################################
+
+        # Build the vocabulary from the word counts
+        self.build_vocab(word_counts)
+
+        # Training data is the corpus encoded lazily as int32 arrays of word IDs, one sentence at a time
+        # The training samples [w_target, w_context] are generated on the fly by train
+        return EncodedCorpus(corpus, self.word_index)
+
+    def build_vocab(self, word_counts):
+        ## How many unique words in vocab? 9
+        self.v_count = len(word_counts.keys())
+        #########################
+        # print(self.v_count)	#
+        # 9						#
+        #########################
+
+        # Generate Lookup Dictionaries (vocab)
+        self.words_list = list(word_counts.keys())
+        #################################################################################################
+        # print(self.words_list)																		#
+        # ['and', 'natural', 'language', 'processing', 'machine', 'learning', 'is', 'fun', 'exciting']	#
+        #################################################################################################
+
+        # Generate word:index
+        self.word_index = dict(zip(self.words_list, range(self.v_count)))
+        #############################################################################################################################
+        # print(self.word_index)																									#
+        # # {'and': 0, 'natural': 1, 'language': 2, 'processing': 3, 'machine': 4, 'learning': 5, 'is': 6, 'fun': 7, 'exciting': 8}	#
+        #############################################################################################################################
+
+        # Generate index:word
+        self.index_word = dict(enumerate(self.words_list))
+        #############################################################################################################################
+        # print(self.index_word)																									#
+        # {0: 'and', 1: 'natural', 2: 'language', 3: 'processing', 4: 'machine', 5: 'learning', 6: 'is', 7: 'fun', 8: 'exciting'}	#
+        #############################################################################################################################
+
+        # Keep the word counts in ID order for the Hoffman tree and the noise distribution of negative sampling
+        self.word_counts = np.fromiter(word_counts.values(), dtype=np.int64, count=self.v_count)
+        #################################
+        # print(self.word_counts)		#
+        # [2 1 1 1 1 1 1 1 1]			#
+        #################################
+
+        # Probability of keeping each occurrence of every word when subsampling frequent words
+        if self.sample > 0:
+            self.keep_probs = keep_probabilities(self.word_counts, self.sample)
+
+        # Generate a Hoffman binary tree based on word_counts if hierarchical_softmax is set to True
+        # points - IDs of the inner units on the path of every word, codes - direction taken at each of them
+        if self.hierarchical_softmax:
+            parent, binary = create_tree(self.word_counts)
+            self.points, self.codes, self.code_lens = create_code(parent, binary, self.v_count)
+        #########################################################################################################################################################
+        # print([list(self.codes[i, :self.code_lens[i]]) for i in range(self.v_count)])																		#
+        # [[0, 0, 1], [0, 0, 0, 1], [0, 0, 0, 0], [1, 1, 1], [1, 1, 0], [1, 0, 1], [1, 0, 0], [0, 1, 1], [0, 1, 0]]											#
+        #########################################################################################################################################################
+
+    # verbose - whether to print the loss of every epoch
+    def train(self, training_data, verbose=True):
+        # Hogwild training with several processes
+        if self.workers > 1:
+            # Imported here so that importing the model does not load multiprocessing
+            from parallel import train_parallel
+            return train_parallel(self, training_data, self.workers, verbose=verbose)
+
+        # Initialising weight matrices
+        self.init_weights()
+        self.monitor.train_start()
+
+        # Cycle through each epoch
+        for i in range(self.epochs):
+            if verbose:
+                print(f'Start Epoch {i}...')
+            self.monitor.epoch_start(i)
+
+            # Intialise loss to 0
+            self.loss = 0
+            self.train_epoch(training_data)
+            self.monitor.epoch_end(i)
+            if verbose:
+                print('Epoch:', i, "Loss:", self.loss)
+
+        # A normalised copy of w1 or an index built by a callback during training is stale
+        self.w1_norm = None
+        self.index = None
+        self.stats = self.monitor.train_end()
+
+    # Registers a callback on the events of training (see hooks.Callback)
+    def add_callback(self, callback):
+        self.callbacks.append(callback)
+
+    # Weight of the loss of the batch_number-th batch of an epoch in self.loss - 1 for every batch when loss_mode is
+    # 'exact', 1 for every loss_every-th batch when 'sampled' (see scale_sampled_loss) and 0 for the batches whose loss is
+    # not computed
+    def loss_weight(self, batch_number):
+        if self.loss_mode == 'exact' or (self.loss_mode == 'sampled' and batch_number % self.loss_every == 0):
+            return 1
+        return 0
+
+    # Scales the loss of the sampled batches of an epoch of batches batches, added to self.loss since start_loss, up to
+    # an estimate of the loss of the whole epoch when loss_mode is 'sampled' - batches 0, loss_every, 2 * loss_every...
+    # are sampled, so an epoch samples ceil(batches / loss_every) of them
+    def scale_sampled_loss(self, start_loss, batches):
+        sampled = -(-batches // self.loss_every)
+        if self.loss_mode == 'sampled' and sampled:
+            self.loss = start_loss + (self.loss - start_loss) * (batches / sampled)
+
+    @staticmethod
+    def softmax(x):
+        # Softmax over the last axis, so that every row of a batch is normalised on its own
+        # Also returns the log of the sum of the exponentials of every row for the loss, with the max of the row
+        # factored out so exp cannot overflow
+        x_max = np.max(x, axis=-1, keepdims=True)
+        e_x = np.exp(x - x_max)
+        e_sum = e_x.sum(axis=-1, keepdims=True)
+        return e_x / e_sum, (x_max + np.log(e_sum))[..., 0]
+
+    def sigmoid(self, x):
+        if self.exp_table is not None:
+            return self.exp_table.sigmoid(x)
+        return sigmoid(x)
+
+    def log_sigmoid(self, x):
+        if self.exp_table is not None:
+            return self.exp_table.log_sigmoid(x)
+        return log_sigmoid(x)
+
+    # Saves the vocabulary, the weight matrices and the settings under prefix (see model_io.py)
+    # dtype - storage type of the matrices, 'float32', or 'float16' or 'bfloat16' to halve their size for serving
+    def save(self, prefix, dtype='float32'):
+        save_model(self, prefix, dtype)
+
+    # Loads a model saved with save - the weight matrices are memory-mapped unless mmap is False
+    @classmethod
+    def load(cls, prefix, mmap=True):
+        return load_model(cls, prefix, mmap)
+
+    # Writes the word vectors (w1) in the .bin format of the original C implementation
+    def save_word2vec_format(self, path):
+        save_word2vec_format(self.words_list, self.w1, path)
+
+    # Creates a model with the word vectors of a .bin file of the original C implementation as w1
+    # Note: the words of a .bin file are sorted by descending count but the counts are not stored, so the vocabulary
+    # gets decreasing placeholder counts in the same order
+    @classmethod
+    def from_word2vec_format(cls, path, settings):
+        words, vectors = load_word2vec_format(path)
+        model = cls(dict(settings, n=vectors.shape[1]))
+        model.build_vocab(dict((word, len(words) - i) for i, word in enumerate(words)))
+        model.w1 = vectors
+
+        return model
+
+    # Get vector from word
+    def word_vec(self, word):
+        w_index = self.word_index[word]
+        v_w = self.w1[w_index]
+        return v_w
+
+    # Get the L2-normalised word vectors, computed once and reused until the weights change
+    def normalized_vectors(self):
+        # Note: w1 stored as float16 is scored in float32, as NumPy has no fast float16 matrix product
+        if self.w1_norm is None:
+            self.w1_norm = normalize_rows(np.asarray(self.w1, dtype=np.promote_types(self.w1.dtype, np.float32)))
+
+        return self.w1_norm
+
+    # Builds an approximate nearest neighbour index of the trained w1 that answers vec_sim and vec_sim_batch from then on
+    # n_lists - number of lists of the index (sqrt(V) by default), n_probe - lists searched per query, more is slower
+    # but finds more of the exact nearest words
+    def build_index(self, n_lists=None, n_probe=N_PROBE):
+        # Built from the normalised copy of w1, so a float16 w1 is indexed and searched in float32 like the exact queries
+        self.index = IVFIndex.build(self.normalized_vectors(), n_lists, n_probe)
+
+        return self.index
+
+    # Input word, returns the top_n nearest words as a list of (word, cosine similarity)
+    def vec_sim(self, word, top_n):
+        return self.vec_sim_batch([word], top_n)[0]
+
+    # Input list of words, returns the list of (word, cosine similarity) of the top_n nearest words of every word
+    # All the words are scored against the whole vocabulary in a single matrix product, or against the closest
+    # lists of the index when there is one
+    def vec_sim_batch(self, words, top_n):
+        normed = self.normalized_vectors()
+        w_ids = np.array([self.word_index[word] for word in words], dtype=np.int64)
+
+        # Find the cosine similary score for each word in vocab except for the query word itself
+        if self.index is not None:
+            ids, scores = self.index.search(normed[w_ids], top_n, exclude=w_ids.reshape((-1, 1)))
+        else:
+            ids, scores = top_k(normed, normed[w_ids], top_n, exclude=w_ids.reshape((-1, 1)))
+
+        return self.ids_to_words(ids, scores)
+
+    # Input words a, b and c, returns the top_n words d that complete "a is to b as c is to d" as a list of (word, score)
+    def analogy(self, a, b, c, top_n=1, method='3cosadd'):
+        return self.analogy_batch([(a, b, c)], top_n, method)[0]
+
+    # Input list of (a, b, c) triples, returns the list of (word, score) of the top_n answers of every triple
+    # method - '3cosadd' (closest to b - a + c) or '3cosmul', all the triples are scored in chunked matrix products
+    # Note: the exact scores are always used, even when there is an index
+    def analogy_batch(self, triples, top_n=1, method='3cosadd'):
+        normed = self.normalized_vectors()
+        w_ids = np.array([[self.word_index[word] for word in triple] for triple in triples], dtype=np.int64).reshape((-1, 3))
+
+        # The words of a triple are never their own answer
+        ids, scores = analogy(normed, w_ids[:, 0], w_ids[:, 1], w_ids[:, 2], top_n, method)
+
+        return self.ids_to_words(ids, scores)
+
+    # Turns the BxK word IDs and scores of a batch of queries into B lists of (word, score), leaving out the excluded words
+    def ids_to_words(self, ids, scores):
+        return [[(self.index_word[i], float(score)) for i, score in zip(row_ids, row_scores) if score > -np.inf]
+                for row_ids, row_scores in zip(ids, scores)]
@@ -0,0 +1,122 @@
+"""
+Saving and loading of trained Word2Vec models. A model is saved under a prefix as
+
+    prefix.json     - index with the model class, the training settings and the shape and layout of every matrix
+    prefix.vocab    - one word and its count per line in ID order (the vocabulary file of corpus.encode_corpus)
+    prefix.w1       - raw little-endian float32 matrices, one file per matrix: w1 and w2, or w1 and
+    prefix.w2         inner_units with hierarchical softmax
+
+so that load can memory-map the matrices and start serving without reading them into memory.
+For serving, the matrices can be stored as float16 or bfloat16 (the top 16 bits of every float32 - the range of
+float32 with 8 bits of precision) to halve their size.
+The binary format of the original C implementation (https://code.google.com/archive/p/word2vec/) is supported too.
+"""
+
+import json
+import numpy as np
+from corpus import load_vocab, write_vocab
+
+# Matrices that are saved with a model when it has them
+MODEL_MATRICES = ('w1', 'w2', 'inner_units')
+
+# Matrices are saved as little-endian float32 unless another storage type is asked for
+MATRIX_DTYPE = '<f4'
+
+# Storage types of the matrices and the type of their raw files - bfloat16 is kept as 16-bit unsigned integers
+STORAGE_DTYPES = {'float32': '<f4', 'float16': '<f2', 'bfloat16': '<u2'}
+
+# Number of bytes read at a time from a file in the binary format of the C implementation
+READ_SIZE = 1 << 20
+
+# Truncates float32 values to bfloat16, returned as the 16-bit patterns
+def to_bfloat16(matrix):
+    return (np.asarray(matrix, dtype='<f4').view('<u4') >> 16).astype('<u2')
+
+# Expands the 16-bit patterns of bfloat16 values back to float32
+def from_bfloat16(bits):
+    return (np.asarray(bits).astype('<u4') << 16).view('<f4')
+
+# Saves the vocabulary, the weight matrices and the settings of a trained model under prefix
+# dtype - storage type of the matrices, 'float32', 'float16' or 'bfloat16'
+def save_model(model, prefix, dtype='float32'):
+    if dtype not in STORAGE_DTYPES:
+        raise ValueError('dtype must be one of %s, not %r' % (', '.join(STORAGE_DTYPES), dtype))
+    file_dtype = STORAGE_DTYPES[dtype]
+
+    write_vocab(dict(zip(model.words_list, model.word_counts.tolist())), prefix)
+
+    # Every matrix is written in its own memory layout (w2 is column-major), so saving it is one sequential write
+    matrices = {}
+    for name in MODEL_MATRICES:
+        matrix = getattr(model, name, None)
+        if matrix is None:
+            continue
+        order = 'F' if matrix.flags['F_CONTIGUOUS'] and not matrix.flags['C_CONTIGUOUS'] else 'C'
+        stored = to_bfloat16(matrix) if dtype == 'bfloat16' else np.asarray(matrix, dtype=file_dtype)
+        stored.ravel(order=order).tofile(prefix + '.' + name)
+        matrices[name] = {'shape': list(matrix.shape), 'order': order}
+
+    with open(prefix + '.json', 'w', encoding='utf-8') as f:
+        json.dump({'model': type(model).__name__, 'settings': dict(model.settings, dtype=model.dtype.name),
+                   'dtype': 'bfloat16' if dtype == 'bfloat16' else file_dtype, 'matrices': matrices}, f, indent=4)
+
+# Loads a model of class cls saved by save_model
+# With mmap the matrices are read-only memory maps, so loading takes milliseconds whatever their size and the pages
+# are only read (and shared between processes) when they are used - otherwise they are read into memory
+# Note: bfloat16 matrices are always expanded to float32 in memory, float16 matrices stay float16
+def load_model(cls, prefix, mmap=True):
+    with open(prefix + '.json', encoding='utf-8') as f:
+        index = json.load(f)
+    if index['model'] != cls.__name__:
+        raise ValueError('%s holds a %s model, not %s' % (prefix, index['model'], cls.__name__))
+
+    model = cls(index['settings'])
+    model.build_vocab(load_vocab(prefix))
+
+    bfloat16 = index['dtype'] == 'bfloat16'
+    file_dtype = STORAGE_DTYPES['bfloat16'] if bfloat16 else index['dtype']
+    for name, spec in index['matrices'].items():
+        shape, order = tuple(spec['shape']), spec['order']
+        if mmap:
+            matrix = np.memmap(prefix + '.' + name, dtype=file_dtype, mode='r', shape=shape, order=order)
+        else:
+            matrix = np.fromfile(prefix + '.' + name, dtype=file_dtype).reshape(shape, order=order)
+        setattr(model, name, from_bfloat16(matrix) if bfloat16 else matrix)
+
+    return model
+
+# Writes word vectors in the binary format of the original C implementation - a "V N" header line, then every word
+# followed by a space, its N little-endian float32 values and a newline
+def save_word2vec_format(words, vectors, path):
+    vectors = np.asarray(vectors, dtype=MATRIX_DTYPE)
+    with open(path, 'wb') as f:
+        f.write(('%d %d\n' % vectors.shape).encode('utf-8'))
+        for word, vector in zip(words, vectors):
+            f.write(word.encode('utf-8') + b' ' + vector.tobytes() + b'\n')
+
+# Reads word vectors in the binary format of the original C implementation
+# Returns the list of words and the VxN float32 matrix of their vectors
+def load_word2vec_format(path):
+    with open(path, 'rb') as f:
+        v_count, n = map(int, f.readline().split())
+        words = []
+        vectors = np.empty((v_count, n), dtype=MATRIX_DTYPE)
+
+        # The words and vectors are parsed out of blocks of READ_SIZE bytes rather than read one byte at a time
+        buffer, position = b'', 0
+        for i in range(v_count):
+            # A word runs up to the next space and is followed by its 4 * n bytes of vector
+            space = buffer.find(b' ', position)
+            while space < 0 or len(buffer) < space + 1 + 4 * n:
+                block = f.read(READ_SIZE)
+                if not block:
+                    raise ValueError('%s ends after %d of %d words' % (path, i, v_count))
+                buffer, position = buffer[position:] + block, 0
+                space = buffer.find(b' ')
+
+            # The newline after the previous vector is optional
+            words.append(buffer[position:space].replace(b'\n', b'').decode('utf-8', errors='replace'))
+            vectors[i] = np.frombuffer(buffer, dtype=MATRIX_DTYPE, count=n, offset=space + 1)
+            position = space + 1 + 4 * n
+
+    return words, vectors
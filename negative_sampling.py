@@ -0,0 +1,89 @@
+"""
+Noise distribution for Word2Vec negative sampling. Negative samples are drawn from the unigram distribution raised
+to a power (0.75 in the original paper) using a precomputed table of word IDs, as in the original C implementation.
+Reference: https://arxiv.org/abs/1310.4546
+"""
+
+import numpy as np
+from scatter import scatter_subtract
+
+# Number of negative samples drawn from the table at once
+BLOCK_SIZE = 1000000
+
+# Creates a table where each word ID fills a share of the slots proportional to count**power
+def create_unigram_table(word_counts, power=0.75, table_size=10000000):
+    probs = np.power(np.asarray(word_counts, dtype=np.float64), power)
+    probs /= probs.sum()
+
+    # Slot boundaries of every word - the cumulative probability scaled to the size of the table
+    bounds = np.round(np.cumsum(probs) * table_size).astype(np.int64)
+    slots = np.diff(bounds, prepend=0)
+
+    # Every word keeps at least one slot so that it can still be drawn as a negative sample
+    slots = np.maximum(slots, 1)
+
+    return np.repeat(np.arange(len(probs), dtype=np.int32), slots)
+
+class NegativeSampler:
+    def __init__(self, word_counts, power=0.75, table_size=10000000, block_size=BLOCK_SIZE):
+        # Table of word IDs following the unigram**power distribution
+        self.table = create_unigram_table(word_counts, power, table_size)
+
+        # Negative samples are drawn from the table in blocks of block_size,
+        # so that sampling is one slice of the buffer instead of one call to the random number generator
+        self.block_size = block_size
+        self.buffer = np.empty(0, dtype=np.int32)
+        self.pos = 0
+
+    # Draws a new block of negative samples into the buffer
+    def refill(self):
+        self.buffer = self.table[np.random.randint(low=0, high=len(self.table), size=self.block_size)]
+        self.pos = 0
+
+    # Returns an array of word IDs of the given shape
+    def sample(self, shape):
+        size = int(np.prod(shape))
+
+        # Requests bigger than a block are drawn directly from the table
+        if size > self.block_size:
+            return self.table[np.random.randint(low=0, high=len(self.table), size=shape)]
+
+        if self.pos + size > len(self.buffer):
+            self.refill()
+
+        samples = self.buffer[self.pos:self.pos + size]
+        self.pos += size
+
+        return samples.reshape(shape)
+
+# Trains the output vectors of a batch of positive samples against their negative samples
+# output_vectors - VxN output vectors (w2.T), h - BxN hidden layers, word_ids - B positive samples,
+# neg_samples - Bxk negative samples, sigmoid - activation of the output layer, log_sigmoid - log of the activation for the loss
+# compute_loss - False skips the loss (returned as 0)
+# The output vectors are updated in place, returns the loss and EH (BxN), the error to backpropagate to the hidden layers
+def negative_sampling(output_vectors, h, word_ids, neg_samples, lr, sigmoid, log_sigmoid, compute_loss=True):
+    # First column of samples is always the positive sample, the rest are negative samples - Bx(k+1)
+    samples = np.concatenate((np.reshape(word_ids, (-1, 1)), neg_samples), axis=1)
+    labels = np.zeros(samples.shape[1], dtype=h.dtype)
+    labels[0] = 1
+
+    # Forward pass through the output vectors of every sample - Bx(k+1)xN vectors, Bx(k+1) outputs
+    vectors = output_vectors[samples]
+    u = np.einsum('bn,bkn->bk', h, vectors)
+    f = sigmoid(u)
+
+    # Calculate loss
+    # There are 2 parts to the loss function (postive sample and negative samples)
+    # -log(sigmoid(u)) for the positive sample and -log(sigmoid(-u)) for the negative samples
+    # Note: log(sigmoid(-u)) is taken directly rather than from 1 - f, which rounds to exactly 0 for large u in float32
+    loss = -np.sum(log_sigmoid(np.where(labels == 1, u, -u))) if compute_loss else 0.0
+
+    # Backpropagation
+    # Error is sigmoid(u) - 1 for the positive sample and sigmoid(u) for the negative samples
+    e = f - labels
+    EH = np.einsum('bk,bkn->bn', e, vectors)
+
+    # Update the output vectors of the samples in place (accumulating the IDs that appear more than once)
+    scatter_subtract(output_vectors, samples, lr * e[:, :, None] * h[:, None, :])
+
+    return loss, EH
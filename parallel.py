@@ -0,0 +1,172 @@
+"""
+Hogwild training of Word2Vec with multiple processes, like the threads of the original C implementation.
+The weight matrices live in shared memory and every worker process trains on its own shard of the corpus,
+applying its sparse updates to the shared matrices without any locking.
+Reference: https://arxiv.org/abs/1106.5730
+"""
+
+import copy
+import time
+import numpy as np
+import multiprocessing as mp
+from multiprocessing import shared_memory
+from multiprocessing.connection import wait
+from corpus import shard_corpus
+from hooks import TrainingMonitor
+from learning_rate import decayed_lr
+
+# Weight matrices that are shared between the workers (when the model has them)
+SHARED_WEIGHTS = ('w1', 'w2', 'inner_units')
+
+# Seconds between two progress lines
+PROGRESS_INTERVAL = 1.0
+
+# Copies an array into a new block of shared memory, keeping its memory layout (w2 is column-major)
+# Returns the shared memory block and the array backed by it
+def share_array(array):
+    order = 'F' if array.flags['F_CONTIGUOUS'] and not array.flags['C_CONTIGUOUS'] else 'C'
+    shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    shared = np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf, order=order)
+    shared[...] = array
+
+    return shm, shared
+
+# Progress line of training - words trained so far out of total_words, current learning rate, speed and time left
+# like the progress of the original C implementation, shared by train_parallel and train.py
+def format_progress(done, total_words, lr, elapsed, workers=1):
+    speed = done / max(elapsed, 1e-9)
+    eta = int((total_words - done) / speed) if done else 0
+
+    return 'Words: %d/%d  Learning rate: %f  Progress: %.2f%%  Words/sec/thread: %.0f  ETA: %d:%02d:%02d' % (
+        done, total_words, lr, 100 * done / max(total_words, 1), speed / workers, eta // 3600, eta // 60 % 60, eta % 60)
+
+class SharedWordCount:
+    def __init__(self):
+        # Number of words trained so far by all the workers, in shared memory (see learning_rate.WordCount)
+        self.words = mp.Value('q', 0)
+
+    @property
+    def value(self):
+        return self.words.value
+
+    # Adds words to the count and returns the new count
+    def add(self, words):
+        with self.words.get_lock():
+            self.words.value += words
+            return self.words.value
+
+# Trains one shard of the corpus for all epochs on the shared weight matrices
+def train_worker(model, specs, training_data, worker, workers, losses, seed):
+    # Every worker draws its own negative samples
+    np.random.seed(seed + worker)
+
+    # Attach the shared weight matrices to the model of this worker
+    blocks = []
+    for name, (shm_name, shape, dtype, order) in specs.items():
+        shm = shared_memory.SharedMemory(name=shm_name)
+        blocks.append(shm)
+        setattr(model, name, np.ndarray(shape, dtype=dtype, buffer=shm.buf, order=order))
+
+    # Callbacks run in the parent only, and the counters and timers of a worker are not reported
+    model.monitor = TrainingMonitor(model)
+
+    shard = shard_corpus(training_data, worker, workers)
+    for epoch in range(model.epochs):
+        model.loss = 0
+        model.train_epoch(shard)
+        with losses.get_lock():
+            losses[epoch] += float(np.sum(model.loss))
+
+    # Drop the arrays backed by the shared memory before closing it
+    for name in specs:
+        setattr(model, name, None)
+    for shm in blocks:
+        shm.close()
+
+# Trains the model on training_data with the given number of worker processes
+# The vocabulary must already be built (generate_training_data or build_vocab) and training_data must be re-iterable
+# verbose - whether to print the progress and the loss of every epoch, callbacks get on_stats either way
+def train_parallel(model, training_data, workers, seed=1, verbose=True):
+    model.init_weights()
+    model.monitor.train_start()
+
+    # The learning rate of every worker decays with the words trained by all of them
+    model.words_done = SharedWordCount()
+
+    # Move the weight matrices into shared memory
+    blocks, shared, specs = [], {}, {}
+    for name in SHARED_WEIGHTS:
+        if getattr(model, name, None) is not None:
+            shm, array = share_array(getattr(model, name))
+            blocks.append(shm)
+            shared[name] = array
+            specs[name] = (shm.name, array.shape, array.dtype, 'F' if not array.flags['C_CONTIGUOUS'] else 'C')
+
+    # Workers get a copy of the model without the weight matrices, which they attach from shared memory
+    worker_model = copy.copy(model)
+    for name in specs:
+        setattr(worker_model, name, None)
+
+    # While the workers train, the model itself reads the shared matrices, so callbacks see the current weights
+    for name, array in shared.items():
+        setattr(model, name, array)
+
+    # Loss of every epoch summed over the workers
+    total_words = model.monitor.total_words
+    losses = mp.Array('d', model.epochs)
+
+    processes = [mp.Process(target=train_worker, args=(worker_model, specs, training_data, worker, workers, losses, seed))
+                 for worker in range(workers)]
+
+    try:
+        start = time.time()
+        for process in processes:
+            process.start()
+
+        # Report the progress of all the workers until they are done
+        # Note: the sentinel of a worker is ready as soon as it exits, while is_alive can stay True until the process
+        # is torn down, so finished workers are tracked by their sentinels to keep the loop from spinning
+        running = {process.sentinel: process for process in processes}
+        while running:
+            for sentinel in wait(list(running), timeout=PROGRESS_INTERVAL):
+                # A failed worker stops training at once instead of after the others are done
+                process = running.pop(sentinel)
+                process.join()
+                if process.exitcode != 0:
+                    raise RuntimeError('Training worker exited with code %d' % process.exitcode)
+
+            done = model.words_done.value
+            model.lr = decayed_lr(model.start_lr, done, total_words)
+            if verbose:
+                print(format_progress(done, total_words, model.lr, time.time() - start, workers), flush=True)
+            model.monitor.words = done
+
+            # The workers keep updating the shared weights, so the callbacks of every report query them afresh
+            model.w1_norm = None
+            model.index = None
+            model.monitor.report(pairs=None, pairs_per_sec=None)
+
+    finally:
+        # Workers still running after an error must not outlive the shared memory they write to
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+            process.join()
+
+        # Copy the weights out of shared memory before it is freed
+        for name, array in shared.items():
+            setattr(model, name, np.array(array, order='K'))
+        shared.clear()
+
+        # A normalised copy of w1 or an index built by a callback during training is stale
+        model.w1_norm = None
+        model.index = None
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
+
+    if verbose:
+        for i in range(model.epochs):
+            print('Epoch:', i, "Loss:", losses[i])
+    model.loss = losses[model.epochs - 1]
+    model.stats = model.monitor.train_end(pairs=None, pairs_per_sec=None)
@@ -0,0 +1,21 @@
+"""
+Scatter updates for the sparse gradients of Word2Vec, where only a few rows of a weight matrix change per step
+"""
+
+import numpy as np
+
+# Subtracts values[i] from matrix[rows[i]] in place, accumulating rows that appear more than once
+def scatter_subtract(matrix, rows, values):
+    n = matrix.shape[1]
+    rows = np.asarray(rows, dtype=np.intp).reshape(-1)
+    values = np.asarray(values).reshape(len(rows), n)
+
+    # np.subtract.at is much faster on a flat index into a 1-D view than on a row index into a 2-D matrix,
+    # but the flat view only exists when the rows are contiguous in memory
+    if not matrix.flags['C_CONTIGUOUS']:
+        np.subtract.at(matrix, rows, values)
+        return
+
+    # rows is intp so that rows * n cannot overflow int32 indexes on large matrices
+    flat_index = (rows.reshape((-1, 1)) * n + np.arange(n)).reshape(-1)
+    np.subtract.at(matrix.reshape(-1), flat_index, values.reshape(-1))
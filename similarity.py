@@ -0,0 +1,87 @@
+"""
+Nearest neighbour search over word vectors by cosine similarity. The vectors are L2-normalised once, so the
+similarity of a batch of queries with the whole vocabulary is a single matrix product, and the top k words are
+picked with np.argpartition in O(V) instead of sorting all V scores.
+
+Analogies "a is to b as c is to d" are answered the same way with 3CosAdd (Mikolov et al.) or 3CosMul
+(Levy and Goldberg). Reference: https://aclanthology.org/W14-1618
+"""
+
+import numpy as np
+
+# Maximum number of similarity scores held in memory at once - bigger batches of queries are split into chunks
+MAX_SCORES = 10000000
+
+# Keeps 3CosMul from dividing by zero
+COSMUL_EPSILON = 0.001
+
+# Returns a copy of vectors with every row scaled to unit length (rows of zeros stay zero)
+def normalize_rows(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    return vectors / np.where(norms > 0, norms, 1)
+
+# Finds the k rows of normed with the highest dot product with every query
+# normed - VxN unit vectors, queries - BxN, exclude - BxE row IDs left out of the results of every query (or None)
+# Returns the row IDs and their scores in descending order of score, both Bxk
+# Note: excluded rows score -inf, so they only come back when k is larger than the number of rows left
+def top_k(normed, queries, k, exclude=None):
+    queries = np.atleast_2d(queries)
+    k = max(min(k, len(normed)), 0)
+    ids = np.empty((len(queries), k), dtype=np.int64)
+    scores = np.empty((len(queries), k), dtype=np.result_type(normed, queries))
+    if k == 0:
+        return ids, scores
+
+    chunk = max(MAX_SCORES // len(normed), 1)
+    for start in range(0, len(queries), chunk):
+        # Cosine similarity of a chunk of queries with every row - CxV
+        sims = np.matmul(queries[start:start + chunk], normed.T)
+        ids[start:start + chunk], scores[start:start + chunk] = select_top_k(sims, k, exclude_chunk(exclude, start, chunk))
+
+    return ids, scores
+
+# Rows of exclude for the chunk of queries starting at start (or None)
+def exclude_chunk(exclude, start, chunk):
+    return None if exclude is None else np.asarray(exclude[start:start + chunk])
+
+# Picks the k best columns of every row of scores in O(V), then sorts only those k
+# exclude - row IDs set to -inf first, one row per row of scores (or None)
+def select_top_k(scores, k, exclude=None):
+    if exclude is not None:
+        np.put_along_axis(scores, exclude, -np.inf, axis=1)
+
+    best = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    best_scores = np.take_along_axis(scores, best, axis=1)
+    order = np.argsort(-best_scores, axis=1, kind='stable')
+
+    return np.take_along_axis(best, order, axis=1), np.take_along_axis(best_scores, order, axis=1)
+
+# Answers the analogies "a is to b as c is to d" for arrays of word IDs a, b and c (one analogy per position)
+# normed - VxN unit vectors, method - '3cosadd' or '3cosmul'
+# The words of every question are left out of its answers, returns the IDs and scores of the top k answers, both Bxk
+def analogy(normed, a, b, c, k, method='3cosadd'):
+    exclude = np.stack((a, b, c), axis=1)
+
+    # 3CosAdd - the words closest to b - a + c (normalised so that the scores are cosine similarities)
+    if method == '3cosadd':
+        return top_k(normed, normalize_rows(normed[b] - normed[a] + normed[c]), k, exclude)
+
+    if method != '3cosmul':
+        raise ValueError("method must be '3cosadd' or '3cosmul', not %r" % method)
+
+    # 3CosMul - cos(d, b) * cos(d, c) / (cos(d, a) + epsilon) with the cosines shifted to [0, 1]
+    # Three CxV similarity matrices are held per chunk, so chunks are a third of the size
+    k = max(min(k, len(normed)), 0)
+    ids = np.empty((len(a), k), dtype=np.int64)
+    scores = np.empty((len(a), k), dtype=normed.dtype)
+    if k == 0:
+        return ids, scores
+
+    chunk = max(MAX_SCORES // (3 * len(normed)), 1)
+    for start in range(0, len(a), chunk):
+        sims_a, sims_b, sims_c = [(np.matmul(normed[w[start:start + chunk]], normed.T) + 1) / 2 for w in (a, b, c)]
+        sims = sims_b * sims_c / (sims_a + COSMUL_EPSILON)
+        ids[start:start + chunk], scores[start:start + chunk] = select_top_k(sims, k, exclude_chunk(exclude, start, chunk))
+
+    return ids, scores
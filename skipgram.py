@@ -8,7 +8,13 @@ Email: derek@derekchia.com
 """
 
 import numpy as np
-from collections import defaultdict
+from corpus import iter_batches, subsample
+from scatter import scatter_subtract
+from negative_sampling import NegativeSampler, negative_sampling
+from hoffman_binary import create_inner_units, hierarchical_softmax
+from hooks import TrainingMonitor
+from learning_rate import WordCount, decay_learning_rate
+from model_base import Word2VecBase
 
 ## Randomly initialise
 getW1 = [[0.236, -0.962, 0.686, 0.785, -0.454, -0.833, -0.744, 0.677, -0.427, -0.066],
@@ -32,347 +38,312 @@ getW2 = [[-0.868, -0.406, -0.288, -0.016, -0.560, 0.179, 0.099, 0.438, -0.551],
 		[-0.838, 0.053, -0.160, -0.164, -0.671, 0.140, -0.149, 0.708, 0.425],
 		[0.096, -0.995, -0.313, 0.881, -0.402, -0.631, -0.660, 0.184, 0.487]]
 
-class skipgram():
+class skipgram(Word2VecBase):
 
 	def __init__(self, settings):
-		self.n = settings['n']
-		self.lr = settings['learning_rate']
-		self.epochs = settings['epochs']
-		self.window = settings['window_size']
+		# The settings shared by both models (see model_base.py)
+		super().__init__(settings)
+		# Number of negative samples per (target, context) pair, 0 -> full softmax (unless hierarchical_softmax is set)
 		self.negative_samples = settings['negative_samples']
+		self.hierarchical_softmax = settings.get('hierarchical_softmax', False)
+
+	def init_weights(self):
+		# New weights make the normalised copy of w1 and its index stale
+		self.w1_norm = None
+		self.index = None
+
+		# New weights start a new training run, with the starting learning rate and no words trained
+		self.monitor = TrainingMonitor(self, self.callbacks, self.timers)
+		self.lr = self.start_lr
+		self.words_done = WordCount()
 
-	def generate_training_data(self, corpus):
-		# Find unique word counts using dictonary
-		word_counts = defaultdict(int)
-		for row in corpus:
-			for word in row:
-				word_counts[word] += 1
-		#########################################################################################################################################################
-		# print(word_counts)																																	#
-		# # defaultdict(<class 'int'>, {'natural': 1, 'language': 1, 'processing': 1, 'and': 2, 'machine': 1, 'learning': 1, 'is': 1, 'fun': 1, 'exciting': 1})	#
-		#########################################################################################################################################################
-
-		## How many unique words in vocab? 9
-		self.v_count = len(word_counts.keys())
-		#########################
-		# print(self.v_count)	#
-		# 9						#
-		#########################
-
-		# Generate Lookup Dictionaries (vocab)
-		self.words_list = list(word_counts.keys())
-		#################################################################################################
-		# print(self.words_list)																		#
-		# ['natural', 'language', 'processing', 'and', 'machine', 'learning', 'is', 'fun', 'exciting']	#
-		#################################################################################################
-		
-		# Generate word:index
-		self.word_index = dict((word, i) for i, word in enumerate(self.words_list))
-		#############################################################################################################################
-		# print(self.word_index)																									#
-		# # {'natural': 0, 'language': 1, 'processing': 2, 'and': 3, 'machine': 4, 'learning': 5, 'is': 6, 'fun': 7, 'exciting': 8}	#
-		#############################################################################################################################
-
-		# Generate index:word
-		self.index_word = dict((i, word) for i, word in enumerate(self.words_list))
-		#############################################################################################################################
-		# print(self.index_word)																									#
-		# {0: 'natural', 1: 'language', 2: 'processing', 3: 'and', 4: 'machine', 5: 'learning', 6: 'is', 7: 'fun', 8: 'exciting'}	#
-		#############################################################################################################################
-
-		training_data = []
-
-		# Cycle through each sentence in corpus
-		for sentence in corpus:
-			sent_len = len(sentence)
-
-			if sent_len == 1:
-				continue 
-
-			# Cycle through each word in sentence
-			for i, word in enumerate(sentence):
-				# Save target word 
-				w_target = word
-
-				# Cycle through context window
-				w_context = []
-
-				# Note: window_size 2 will have range of 5 values
-				for j in range(i - self.window, i + self.window+1):
-					# Criteria for context word 
-					# 1. Target word cannot be context word (j != i)
-					# 2. Index must be greater or equal than 0 (j >= 0) - if not list index out of range
-					# 3. Index must be less or equal than length of sentence (j <= sent_len-1) - if not list index out of range 
-					if j != i and j <= sent_len-1 and j >= 0:
-						# Append context word to w_context
-						w_context.append(sentence[j])
-						# print(sentence[i], sentence[j]) 
-						#########################
-						# Example:				#
-						# natural language		#
-						# natural processing	#
-						# language natural		#
-						# language processing	#
-						# language append 		#
-						#########################
-						
-				# training_data contains a one-hot representation of the target word and context words
-                # only the word is store instead of its one-hot encoding due to storage limit and it crashes kernel
-				#################################################################################################
-				# Example:																						#
-				# [Target] natural, [Context] language, [Context] processing									#
-				# print(training_data)																			#
-				# [[[1, 0, 0, 0, 0, 0, 0, 0, 0], [[0, 1, 0, 0, 0, 0, 0, 0, 0], [0, 0, 1, 0, 0, 0, 0, 0, 0]]]]	#
-				#################################################################################################
-				training_data.append([w_target, w_context])
-
-		return training_data
-
-	def word2onehot(self, word):
-		# word_vec - initialise a blank vector
-		word_vec = np.zeros(self.v_count)
-		#############################
-		# print(word_vec)			#
-		# [0, 0, 0, 0, 0, 0, 0, 0]	#
-		#############################
-
-		# Get ID of word from word_index
-		word_index = self.word_index[word]
-
-		# Change value from 0 to 1 according to ID of the word
-		word_vec[word_index] = 1
-
-		return word_vec
-
-	def train(self, training_data):
 		# Initialising weight matrices
 		# np.random.uniform(HIGH, LOW, OUTPUT_SHAPE)
 		# https://docs.scipy.org/doc/numpy-1.15.1/reference/generated/numpy.random.uniform.html
-		self.w1 = np.array(getW1)
-		self.w2 = np.array(getW2)
-		# self.w1 = np.random.uniform(-1, 1, (self.v_count, self.n))
-		# self.w2 = np.random.uniform(-1, 1, (self.n, self.v_count))
-		
-		if self.negative_samples == 0:
-			# Cycle through each epoch
-			for i in range(self.epochs):
-				print(f'Start Epoch {i}...')
-
-				# Intialise loss to 0
-				self.loss = 0
-
-				# Cycle through each training sample
-				# w_t = vector for target word, w_c = vectors for context words
-				for w_t, w_c in training_data:
-					w_t = self.word2onehot(w_t).reshape((-1, 1))
-					w_c = [self.word2onehot(context) for context in w_c]
-					# Forward pass
-					# 1. predicted y using softmax (y_pred) 2. matrix of hidden layer (h) 3. output layer before softmax (u)
-					y_pred, h, u = self.forward_pass(w_t)
-					#########################################
-					# print("Vector for target word:", w_t)	#
-					# print("W1-before backprop", self.w1)	#
-					# print("W2-before backprop", self.w2)	#
-					#########################################
-
-					# Calculate error
-					# 1. For a target word, calculate difference between y_pred and each of the context words
-					# 2. Sum up the differences using np.sum to give us the error for this particular target word
-					EI = np.sum([np.subtract(y_pred, word.reshape((-1, 1))) for word in w_c], axis=0)
-					#########################
-					# print("Error", EI)	#
-					#########################
-
-					# Backpropagation
-					# We use SGD to backpropagate errors - calculate loss on the output layer 
-					self.backprop(EI, h, w_t)
-					#########################################
-					#print("W1-after backprop", self.w1)	#
-					#print("W2-after backprop", self.w2)	#
-					#########################################
-
-					# Calculate loss
-					# There are 2 parts to the loss function
-					# Part 1: -ve sum of all the output +
-					# Part 2: length of context words * log of sum for all elements (exponential-ed) in the output layer before softmax (u)
-					# Note: word.index(1) returns the index in the context word vector with value 1
-					# Note: u[word.index(1)] returns the value of the output layer before softmax
-					self.loss += -np.sum([u[np.where(word == 1)[0][0]] for word in w_c]) + len(w_c) * np.log(np.sum(np.exp(u)))
-					
-					#############################################################
-					# Break if you want to see weights after first target word 	#
-					# break 													#
-					#############################################################
-				print('Epoch:', i, "Loss:", self.loss)
-		
+		# Note: the fixed weights above are only used when the vocabulary has the shape of the demo
+		# Note: w2 is stored column-major (w2.T is contiguous) so the output vector of a word is one
+		# contiguous block of memory for the gathers and scatter-adds of negative sampling
+		# Note: hierarchical softmax has no w2 as the inner units of the Hoffman tree take its place
+		if (self.v_count, self.n) == np.shape(getW1):
+			self.w1 = np.array(getW1, dtype=self.dtype)
+			if not self.hierarchical_softmax:
+				self.w2 = np.asfortranarray(getW2, dtype=self.dtype)
 		else:
-			# Cycle through each epoch
-			for i in range(self.epochs):
-				print(f'Start Epoch {i}...')
-
-				# Intialise loss to 0
-				self.loss = 0
-
-				# Cycle through each training sample
-				# w_t = vector for target word, w_c = vectors for context words
-				for w_t, w_c in training_data:
-					w_t = self.word2onehot(w_t).reshape((-1, 1))
-					w_c = [self.word2onehot(context) for context in w_c]
-					# Forward pass
-					# 1. matrix of hidden layer (h) 2. output layer before softmax (u)
-					# Run through first matrix (w1) to get hidden layer - NxV @ Vx1
-					h = np.matmul(self.w1.T, w_t)
-					# Dot product hidden layer with second matrix (w2) - VxN @ Nx1
-					# Note: outputs before softmax are important since they stay the same 
-					# and allow us to alter w2 without worrying about the loss function
-					u = np.matmul(self.w2.T, h)
-
-					#########################################
-					# print("Vector for target word:", w_t)	#
-					# print("W1-before backprop", self.w1)	#
-					# print("W2-before backprop", self.w2)	#
-					#########################################
-
-					# Initialize EH for backpropagating to w1
-					EH = np.zeros((self.n, 1))
-
-					# Iterate through every context word as postive sample
-					# and use uniform distribution to draw negative samples
-					# TODO: uniform distribution for now but will do more research on unigram
-					for j in range(len(w_c)):
-						# Get postive and negative samples
-						pos_sample = w_c[j]
-						neg_samples = np.random.randint(low=0, high=self.v_count, size=self.negative_samples)
-
-						# Get the intermediate steps and store the tuples (idx, u[idx]) in updates to avoid redundant computation
-						# First element in updates is always the positive sample
-						updates = []
-						updates.append((np.where(pos_sample == 1)[0][0], self.sigmoid(u[np.where(pos_sample == 1)[0][0]])))
-						for idx in neg_samples:
-							updates.append((idx, self.sigmoid(-u[idx])))
-						
-						# Calculate loss
-						# There are 2 parts to the loss function (postive sample and negative samples)
-						self.loss += -np.log(updates[0][1]) - sum([np.log(neg) for _, neg in updates[1:]])
-
-						# Backpropagation
-						# We use SGD to backpropagate errors - calculate loss on the output layer
-						# Update vector in w2 (NxV) corresponding to the positive sample
-						self.w2[:, [updates[0][0]]] = self.w2[:, [updates[0][0]]] - (self.lr * (updates[0][1] - 1) * h)
-						EH += (updates[0][1] - 1) * self.w2[:, [updates[0][0]]]
-						
-						# Update vector in w2 corresponding to the negative sample
-						for (idx, neg) in updates[1:]:
-							self.w2[:, [idx]] = self.w2[:, [idx]] - (self.lr * (1 - neg) * h)
-							EH += (1 - neg) * self.w2[:, [idx]]
-					
-					# After calculating EH for each context word, we can now update w1 as normal skipgram
-					dl_dw1 = np.outer(w_t, EH)
-					self.w1 = self.w1 - (self.lr * dl_dw1)
-
-					#########################################
-					#print("W1-after backprop", self.w1)	#
-					#print("W2-after backprop", self.w2)	#
-					#########################################
+			self.w1 = np.random.uniform(-1, 1, (self.v_count, self.n)).astype(self.dtype)
+			if not self.hierarchical_softmax:
+				self.w2 = np.asfortranarray(np.random.uniform(-1, 1, (self.n, self.v_count)).astype(self.dtype))
+
+		if self.hierarchical_softmax:
+			# Initialise the inner units of the Hoffman tree - (V-1)xN
+			self.inner_units = create_inner_units(self.v_count, self.n, dtype=self.dtype)
+
+		elif self.negative_samples > 0:
+			# Build the unigram table that negative samples are drawn from
+			self.sampler = NegativeSampler(self.word_counts, self.ns_exponent, self.table_size)
+
+	def train_epoch(self, training_data):
+		# Runs one epoch over training_data with the weights from init_weights, adding the loss of the epoch to self.loss
+		# Training updates w1, so the normalised copy and its index are dropped
+		self.w1_norm = None
+		self.index = None
+
+		# Count the words read and time the phases of every batch (lap does nothing unless timers are on)
+		monitor = self.monitor
+		lap = monitor.lap
+		training_data = monitor.count_words(training_data)
+
+		# The learning rate decays with the words read, before subsampling like the C implementation
+		training_data = decay_learning_rate(self, training_data)
+
+		# Batches trained before this epoch and loss before it, to scale up the loss of the sampled batches at the end
+		start_batches, start_loss = monitor.batches, self.loss
+
+		# Frequent words are subsampled with a new draw every epoch
+		if self.sample > 0:
+			training_data = subsample(training_data, self.keep_probs)
+
+		if self.hierarchical_softmax:
+			# Cycle through the training samples in groups of batch_size target words
+			# Every context word is predicted from its target word through the inner units on the path of the
+			# context word, and all the (target, context) pairs of a group are trained as one batch
+			for batch_number, batch in enumerate(iter_batches(training_data, self.window, self.batch_size)):
+				centers, contexts = self.get_pairs(batch)
+				lap('batch')
+				#########################################
+				# print("IDs of target words:", centers)#
+				# print("W1-before backprop", self.w1)	#
+				#########################################
+
+				# Forward pass
+				# Look up the rows of the target words in w1 to get the hidden layers - BxN
+				h = self.w1[centers]
+				lap('forward')
+
+				# Forward pass through the inner units on the paths of the context words, loss and update of the inner units
+				loss_weight = self.loss_weight(batch_number)
+				loss, EH = hierarchical_softmax(self.inner_units, self.points, self.codes, self.code_lens, h, contexts, self.lr, self.sigmoid, self.log_sigmoid, loss_weight > 0)
+				self.loss += loss_weight * loss
+				lap('output')
+
+				# Backpropagation
+				# Scatter the error of every pair onto the row of its target word in w1
+				scatter_subtract(self.w1, centers, self.lr * EH)
+				lap('update')
+				monitor.batch_end(len(contexts))
+				#########################################
+				#print("W1-after backprop", self.w1)	#
+				#########################################
+
+		elif self.negative_samples == 0:
+			# Cycle through the training samples in groups of batch_size target words
+			# All the target words of a group go through the full softmax as one BxV matrix product
+			for batch_number, batch in enumerate(iter_batches(training_data, self.window, self.batch_size)):
+				# w_t = IDs of target words, w_c = arrays of IDs of context words
+				w_t = np.array([target for target, _ in batch])
+				w_c = [context for _, context in batch]
+				# Row of every context word in the batch, to pick it out of the BxV outputs
+				c = np.array([len(context) for context in w_c])
+				rows = np.repeat(np.arange(len(w_t)), c)
+				contexts = np.concatenate(w_c)
+				lap('batch')
+
+				# Forward pass
+				# 1. predicted y using softmax (y_pred) 2. matrix of hidden layer (h) 3. output layer before softmax (u)
+				# 4. log of the sum of the exponentials of every row of u (lse), computed by the softmax
+				y_pred, h, u, lse = self.forward_pass(w_t)
+				lap('forward')
+				#########################################
+				# print("IDs of target words:", w_t)	#
+				# print("W1-before backprop", self.w1)	#
+				# print("W2-before backprop", self.w2)	#
+				#########################################
+
+				# Calculate error
+				# 1. For a target word, calculate difference between y_pred and each of the context words
+				# 2. Sum up the differences to give us the error for this particular target word
+				# Note: the sum of (y_pred - one-hot) over C context words is C * y_pred with 1 subtracted once per
+				# occurrence of every context ID, so np.subtract.at handles context words that appear more than once
+				EI = c.reshape((-1, 1)).astype(y_pred.dtype) * y_pred
+				np.subtract.at(EI, (rows, contexts), 1)
+				#########################
+				# print("Error", EI)	#
+				#########################
+
+				# Backpropagation
+				# We use SGD to backpropagate errors - calculate loss on the output layer 
+				self.backprop(EI, h, w_t)
+				lap('update')
+				#########################################
+				#print("W1-after backprop", self.w1)	#
+				#print("W2-after backprop", self.w2)	#
+				#########################################
+
+				# Calculate loss
+				# There are 2 parts to the loss function
+				# Part 1: -ve sum of all the output +
+				# Part 2: length of context words * log of sum for all elements (exponential-ed) in the output layer before softmax (u)
+				# Note: u[rows, contexts] gathers the value of the output layer before softmax for every context word
+				# Note: the log of the sum comes from the softmax, so the loss costs O(B) and not another BxV exp
+				loss_weight = self.loss_weight(batch_number)
+				if loss_weight:
+					self.loss += loss_weight * (-np.sum(u[rows, contexts]) + np.sum(c.astype(lse.dtype) * lse))
+				lap('loss')
+				monitor.batch_end(len(contexts))
 				
-					#############################################################
-					# Break if you want to see weights after first target word 	#
-					# break 													#
-					#############################################################
-				print('Epoch:', i, "Loss:", self.loss)
+				#############################################################
+				# Break if you want to see weights after first batch 		#
+				# break 													#
+				#############################################################
+
+		else:
+			# Cycle through the training samples in groups of batch_size target words
+			# Every context word is a positive sample for its target word, so all the (target, context) pairs
+			# of a group are trained as one batch to keep the number of small NumPy calls down
+			for batch_number, batch in enumerate(iter_batches(training_data, self.window, self.batch_size)):
+				centers, contexts = self.get_pairs(batch)
+				lap('batch')
+				#########################################
+				# print("IDs of target words:", centers)#
+				# print("W1-before backprop", self.w1)	#
+				# print("W2-before backprop", self.w2)	#
+				#########################################
+
+				self.loss += self.negative_sampling_step(centers, contexts, self.loss_weight(batch_number))
+				monitor.batch_end(len(contexts))
+
+				#########################################
+				#print("W1-after backprop", self.w1)	#
+				#print("W2-after backprop", self.w2)	#
+				#########################################
+			
+				#############################################################
+				# Break if you want to see weights after first batch 		#
+				# break 													#
+				#############################################################
+
+		self.scale_sampled_loss(start_loss, monitor.batches - start_batches)
+
+	def get_pairs(self, batch):
+		# batch is a list of training samples [w_t, w_c]
+		# Returns the (target, context) pairs of the batch as two arrays - the ID of the target word repeated
+		# once for each of its context words and the IDs of the context words
+		w_t = np.array([target for target, _ in batch])
+		w_c = [context for _, context in batch]
+		centers = np.repeat(w_t, [len(context) for context in w_c])
+		contexts = np.concatenate(w_c)
+
+		return centers, contexts
+
+	def negative_sampling_step(self, centers, contexts, loss_weight=1):
+		# centers - IDs of the input words, shape B
+		# contexts - IDs of the positive samples for each input word, shape B
+		# Each (center, context) pair is scored against its positive sample and k negative samples,
+		# with all B x (k+1) dot products, sigmoids and updates done as a handful of array operations
+		# Returns the loss of the batch times loss_weight (see loss_weight)
+
+		lap = self.monitor.lap
+
+		# Draw k negative samples per pair from the unigram distribution raised to ns_exponent
+		neg_samples = self.sampler.sample((len(centers), self.negative_samples))
+		lap('sample')
+
+		# Forward pass
+		# Look up the rows of the target words in w1 to get the hidden layers - BxN
+		h = self.w1[centers]
+		lap('forward')
+
+		# Forward pass through the output vectors of the samples, loss and update of w2
+		# Note: w2 is stored column-major so its columns are the contiguous rows of w2.T
+		loss, EH = negative_sampling(self.w2.T, h, contexts, neg_samples, self.lr, self.sigmoid, self.log_sigmoid, loss_weight > 0)
+		lap('output')
+
+		# Backpropagation
+		# Scatter the error of every pair onto the row of its target word in w1
+		scatter_subtract(self.w1, centers, self.lr * EH)
+		lap('update')
+
+		return loss_weight * loss
 
 	def forward_pass(self, x):
-		# x is one-hot vector for target word, shape - Vx1
-		# Run through first matrix (w1) to get hidden layer - NxV @ Vx1
-		h = np.matmul(self.w1.T, x)
-		# Dot product hidden layer with second matrix (w2) - VxN @ Nx1 
-		u = np.matmul(self.w2.T, h)
-		# Run 1x9 through softmax to force each element to range of [0, 1] - 1x8
-		y_c = self.softmax(u)
-		return y_c, h, u
-
-	def softmax(self, x):
-		e_x = np.exp(x - np.max(x))
-		return e_x / e_x.sum(axis=0)
-	
-	def sigmoid(self, x):
-		return 1/(1+np.exp(-x))
+		# x is the array of IDs of the B target words of a batch
+		# Look up the rows of x in the first matrix (w1) to get the hidden layers - BxN
+		# Note: this is the same as BxV @ VxN with one-hot vectors but costs O(BN) instead of O(BVN)
+		h = self.w1[x]
+		# Dot product hidden layers with second matrix (w2) - BxN @ NxV
+		u = np.matmul(h, self.w2)
+		# Run every row of u through softmax to force each element to range of [0, 1] - BxV
+		y_c, lse = self.softmax(u)
+		return y_c, h, u, lse
 
 	def backprop(self, e, h, x):
-		# https://docs.scipy.org/doc/numpy-1.15.1/reference/generated/numpy.outer.html
-		# Column vector EI represents row-wise sum of prediction errors across each context word for the current center word
+		# Every row of EI represents the row-wise sum of prediction errors across each context word for one center word
 		# Going backwards, we need to take derivative of E with respect of w2
-		# h - shape 10x1, e - shape 9x1, dl_dw2 - shape 10x9
-		# x - shape 9x1, w2 - 10x9, e.T - 9x1
-		dl_dw2 = np.outer(h, e)
-		dl_dw1 = np.outer(x, np.dot(self.w2, e))
+		# h - shape BxN, e - shape BxV, dl_dw2 - shape NxV (summed over the batch)
+		# x - IDs of target words, w2 - NxV
+		# Note: only the rows x of w1 were used in the forward pass so dl_dw1 is one row per target word - BxN
+		dl_dw2 = np.matmul(h.T, e)
+		dl_dw1 = np.matmul(e, self.w2.T)
 		########################################
 		# print('Delta for w2', dl_dw2)			#
 		# print('Hidden layer', h)				#
-		# print('np.dot', np.dot(self.w2, e.T))	#
 		# print('Delta for w1', dl_dw1)			#
 		#########################################
 
-		# Update weights
-		self.w1 = self.w1 - (self.lr * dl_dw1)
-		self.w2 = self.w2 - (self.lr * dl_dw2)
-
-	# Get vector from word
-	def word_vec(self, word):
-		w_index = self.word_index[word]
-		v_w = self.w1[w_index]
-		return v_w
-
-	# Input vector, returns nearest word(s)
-	def vec_sim(self, word, top_n):
-		v_w1 = self.word_vec(word)
-		word_sim = {}
-
-		for i in range(self.v_count):
-			if self.index_word[i] != word:
-				# Find the cosine similary score for each word in vocab except for the current word
-				v_w2 = self.w1[i]
-				theta_sum = np.dot(v_w1, v_w2)
-				theta_den = np.linalg.norm(v_w1) * np.linalg.norm(v_w2)
-				theta = theta_sum / theta_den
-
-				w2 = self.index_word[i]
-				word_sim[w2] = theta
-
-		words_sorted = sorted(word_sim.items(), key=lambda kv: kv[1], reverse=True)
-
-		for word, sim in words_sorted[:top_n]:
-			print(word, sim)
+		# Update weights in place
+		# Note: scatter_subtract accumulates the rows of target words that appear more than once in the batch
+		# Note: every column of w2 gets a gradient under full softmax so dl_dw2 stays dense,
+		# but subtracting in place avoids allocating a new VxN matrix per batch
+		# Note: dl_dw2 sums the dense gradients of all B target words, so its step is averaged over the batch - a learning
+		# rate that is stable for one target word then stays stable for a whole batch of them
+		scatter_subtract(self.w1, x, self.lr * dl_dw1)
+		self.w2 -= (self.lr / len(x)) * dl_dw2
 
 #####################################################################
-settings = {
-	'window_size': 2,			# context window +- center word
-	'n': 10,					# dimensions of word embeddings, also refer to size of hidden layer
-	'epochs': 50,				# number of training epochs
-	'learning_rate': 0.01,		# learning rate
-	'negative_samples': 3   	# number of negative samples
-								# 0 -> normal skipgram
-}
-
-text = "natural language processing and machine learning is fun and exciting"
-
-# Note the .lower() as upper and lowercase does not matter in our implementation
-# [['natural', 'language', 'processing', 'and', 'machine', 'learning', 'is', 'fun', 'and', 'exciting']]
-corpus = [[word.lower() for word in text.split()]]
-
-# Initialise object
-w2v = skipgram(settings)
-
-# Numpy ndarray with one-hot representation for [target_word, context_words]
-training_data = w2v.generate_training_data(corpus)
-
-# Training
-w2v.train(training_data)
-
-# Get vector for word
-word = "machine"
-vec = w2v.word_vec(word)
-print(word, vec)
-
-# Find similar words
-w2v.vec_sim("machine", 3)
+if __name__ == '__main__':
+	settings = {
+		'window_size': 2,			# context window +- center word
+		'n': 10,					# dimensions of word embeddings, also refer to size of hidden layer
+		'epochs': 50,				# number of training epochs
+		'learning_rate': 0.01,		# learning rate
+		'batch_size': 64,			# number of target words trained together in one batch
+		'dtype': 'float32',			# floating point type of the weight matrices (float32 or float64)
+		'exp_table': False,			# whether or not to look up sigmoid in a table, with the dot products clipped to +-max_exp
+		'max_exp': 6,				# clip range of the table
+		'exp_table_size': 1000,	# number of steps of the table
+		'sample': 0,				# threshold for subsampling frequent words, e.g. 1e-3 (0 -> no subsampling)
+		'min_count': 1,				# words seen fewer times are left out of the vocabulary
+		'max_vocab_size': None,		# limit on distinct words while counting, the rarest are pruned (None -> no limit)
+		'negative_samples': 3,   	# number of negative samples
+									# 0 -> normal skipgram
+		'hierarchical_softmax': False,	# whether or not to implement hierarchical softmax instead of negative sampling
+		'ns_exponent': 0.75,		# exponent of the unigram distribution that negative samples are drawn from
+		'table_size': 10000000,		# number of slots in the unigram table
+		'workers': 1,				# number of worker processes training in parallel
+		'timers': False,			# whether or not to time the phases of every batch (see hooks.py)
+		'loss_mode': 'exact',		# loss of every batch (exact), of every loss_every-th batch (sampled) or none (off)
+		'loss_every': 100			# batches between two losses when sampled
+	}
+
+	text = "natural language processing and machine learning is fun and exciting"
+
+	# Note the .lower() as upper and lowercase does not matter in our implementation
+	# [['natural', 'language', 'processing', 'and', 'machine', 'learning', 'is', 'fun', 'and', 'exciting']]
+	corpus = [[word.lower() for word in text.split()]]
+
+	# Initialise object
+	w2v = skipgram(settings)
+
+	# Corpus encoded lazily as int32 arrays of word IDs, the [target_word, context_words] samples are generated by train
+	training_data = w2v.generate_training_data(corpus)
+
+	# Training
+	w2v.train(training_data)
+
+	# Get vector for word
+	word = "machine"
+	vec = w2v.word_vec(word)
+	print(word, vec)
+
+	# Find similar words
+	for word, sim in w2v.vec_sim("machine", 3):
+		print(word, sim)
@@ -0,0 +1,119 @@
+"""
+Command line tool to train a Word2Vec model on a text corpus (one sentence per line) and save it with save, ready for
+load or word2vec.load. The corpus is read as a stream - from a file, from stdin or from the word ID files written by
+corpus.py - and a progress line is printed every STATS_INTERVAL seconds.
+
+Run with: python train.py corpus.txt model --model skipgram --n 100 --window-size 5 --negative-samples 5 --epochs 5
+or, from a pipeline: zcat corpus.txt.gz | python train.py - model --workers 4
+or, on a corpus encoded with corpus.py: python train.py corpus model --encoded
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import numpy as np
+import word2vec
+from corpus import LineSentence, MemmapCorpus, load_vocab
+from parallel import format_progress
+from hooks import Callback, MetricsLogger
+
+# Every key of settings with its type, default and description (None -> the default of the model)
+SETTINGS = [
+    ('window_size', int, 5, 'context window +- center word'),
+    ('n', int, 100, 'dimensions of word embeddings'),
+    ('epochs', int, 5, 'number of training epochs'),
+    ('learning_rate', float, 0.025, 'learning rate'),
+    ('batch_size', int, 64, 'number of target words trained together in one batch'),
+    ('dtype', str, 'float32', 'floating point type of the weight matrices (float32 or float64)'),
+    ('negative_samples', int, 5, 'number of negative samples, 0 -> full softmax (unless hierarchical softmax)'),
+    ('hierarchical_softmax', bool, False, 'train with hierarchical softmax instead of negative sampling'),
+    ('ns_exponent', float, 0.75, 'exponent of the unigram distribution that negative samples are drawn from'),
+    ('table_size', int, 10000000, 'number of slots in the unigram table'),
+    ('exp_table', bool, False, 'look up sigmoid in a table, with the dot products clipped to +-max_exp'),
+    ('max_exp', float, 6, 'clip range of the sigmoid table'),
+    ('exp_table_size', int, 1000, 'number of steps of the sigmoid table'),
+    ('sample', float, 0, 'threshold for subsampling frequent words, e.g. 1e-3 (0 -> no subsampling)'),
+    ('min_count', int, 1, 'words seen fewer times are left out of the vocabulary'),
+    ('max_vocab_size', int, None, 'limit on distinct words while counting, the rarest are pruned'),
+    ('workers', int, 1, 'number of worker processes training in parallel'),
+    ('timers', bool, False, 'time the phases of every batch and print the time of every phase'),
+    ('loss_mode', str, 'exact', 'loss of every batch (exact), of every loss_every-th batch (sampled) or none (off)'),
+    ('loss_every', int, 100, 'batches between two losses when loss_mode is sampled'),
+]
+
+class ProgressLine(Callback):
+    # Prints the words trained, the learning rate, the speed and the time left every STATS_INTERVAL seconds
+    # and once training is done
+    def on_stats(self, model, stats):
+        print(format_progress(stats['words'], stats['total_words'], stats['lr'], stats['elapsed'], model.workers), flush=True)
+
+    def on_train_end(self, model, stats):
+        self.on_stats(model, stats)
+
+# Adds an option for every key of settings to parser
+def add_settings_arguments(parser):
+    group = parser.add_argument_group('settings')
+    for key, kind, default, help in SETTINGS:
+        flag = '--' + key.replace('_', '-')
+        if kind is bool:
+            group.add_argument(flag, dest=key, action='store_true', help=help)
+        else:
+            group.add_argument(flag, dest=key, type=kind, default=default, help='%s (default %s)' % (help, default))
+
+# Copies stdin into a temporary file, as training reads the corpus once to build the vocabulary and once per epoch
+# Returns the path of the file, which the caller removes
+def spool_stdin():
+    with tempfile.NamedTemporaryFile('wb', suffix='.txt', delete=False) as f:
+        shutil.copyfileobj(sys.stdin.buffer, f)
+
+    return f.name
+
+# Builds the vocabulary and trains the model on the corpus
+def train_model(model, sentences, encoded=False):
+    if encoded:
+        model.build_vocab(load_vocab(sentences))
+        training_data = MemmapCorpus(sentences)
+    else:
+        training_data = model.generate_training_data(LineSentence(sentences))
+    print('Vocabulary: %d words, training on %d words per epoch' % (model.v_count, int(np.sum(model.word_counts))), flush=True)
+
+    # Progress lines instead of the loss of every epoch
+    model.add_callback(ProgressLine())
+    model.train(training_data, verbose=False)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Train a Word2Vec model on a text corpus (one sentence per line)')
+    parser.add_argument('input', help='text file to train on (- for stdin), or with --encoded the prefix of corpus.py files')
+    parser.add_argument('output', help='prefix the model is saved under (see save)')
+    parser.add_argument('--model', choices=list(word2vec.MODELS), default='skipgram', help='model to train')
+    parser.add_argument('--encoded', action='store_true', help='input is a corpus encoded by corpus.py (already pruned)')
+    parser.add_argument('--save-dtype', choices=['float32', 'float16', 'bfloat16'], default='float32',
+                        help='floating point type the weight matrices are stored with')
+    parser.add_argument('--word2vec-format', metavar='PATH', help='also write the word vectors in the binary format of the C tool')
+    parser.add_argument('--metrics', metavar='PATH', help='append the training statistics to this file as JSON lines')
+    add_settings_arguments(parser)
+    args = parser.parse_args()
+
+    settings = {key: getattr(args, key) for key, *_ in SETTINGS if getattr(args, key) is not None}
+    model = word2vec.get_model(args.model)(settings)
+    if args.metrics:
+        model.add_callback(MetricsLogger(args.metrics))
+
+    path = spool_stdin() if args.input == '-' else args.input
+    try:
+        start = time.time()
+        train_model(model, path, args.encoded)
+        print('Trained in %.1fs, loss of the last epoch %f' % (time.time() - start, float(np.sum(model.loss))), flush=True)
+        for phase, seconds in model.stats['times'].items():
+            print('%-8s %8.2fs' % (phase, seconds))
+    finally:
+        if args.input == '-':
+            os.remove(path)
+
+    model.save(args.output, args.save_dtype)
+    if args.word2vec_format:
+        model.save_word2vec_format(args.word2vec_format)
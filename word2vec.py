@@ -0,0 +1,53 @@
+"""
+Both Word2Vec models behind one import. The model modules, and NumPy with them, are only loaded the first time a
+model is used, so importing this module is instant and has no side effects - cheap for services and worker processes
+that only need a model some of the time.
+
+Usage:
+    import word2vec
+    from word2vec import skipgram, word2vec_cbow
+    model = word2vec.get_model('cbow')(settings)
+    model = word2vec.load('model')      # a model saved with save, whichever class it was trained with
+
+To see a model in action, run its demo: python skipgram.py or python cbow.py
+"""
+
+import importlib
+import json
+
+# Model names and the module and class every model is defined in
+MODELS = {
+    'skipgram': ('skipgram', 'skipgram'),
+    'cbow': ('cbow', 'word2vec_cbow'),
+}
+
+__all__ = ['MODELS', 'get_model', 'load', 'skipgram', 'word2vec_cbow']
+
+# Returns the class of a model by name ('skipgram' or 'cbow'), importing its module on first use
+def get_model(name):
+    if name not in MODELS:
+        raise ValueError('unknown model %r, expected one of %s' % (name, ', '.join(MODELS)))
+    module, cls = MODELS[name]
+
+    return getattr(importlib.import_module(module), cls)
+
+# Loads a model saved with save under prefix with the class it was trained with (see model_io.load_model)
+def load(prefix, mmap=True):
+    with open(prefix + '.json', encoding='utf-8') as f:
+        cls = json.load(f)['model']
+    for name, (_, model_cls) in MODELS.items():
+        if model_cls == cls:
+            return get_model(name).load(prefix, mmap)
+
+    raise ValueError('%s holds an unknown model %r' % (prefix, cls))
+
+# Model classes are imported lazily on attribute access (PEP 562)
+def __getattr__(name):
+    for model, (_, cls) in MODELS.items():
+        if cls == name:
+            return get_model(model)
+
+    raise AttributeError('module %r has no attribute %r' % (__name__, name))
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))